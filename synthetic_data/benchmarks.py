@@ -0,0 +1,168 @@
+import sys
+import time
+import tempfile
+import numpy as np
+import tensorflow as tf
+
+
+def time_function(function, *args, repeats: int = 20) -> float:
+    # first call traces / warms up, the rest are timed - returns mean seconds per call
+    function(*args)
+
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        result = function(*args)
+    # force the last result to the host so async execution is included in the time
+    np.asarray(result)
+
+    return (time.perf_counter() - start_time) / repeats
+
+
+def layer_stack(model: tf.keras.Sequential):
+    # the layers of a sequential model called one by one, same weights - unlike the model itself this takes any input rank
+    def call(x, training=False):
+        for layer in model.layers:
+            x = layer(x, training=training)
+
+        return x
+
+    return call
+
+
+def benchmark_gradient_penalty(
+    batch_sizes: tuple = (32, 64, 128, 256, 512, 1024),
+    number_features: int = 12,
+    repeats: int = 20) -> list:
+    """
+    times the wgan-gp penalty for the rank aware (tabular) and the image style coefficient shape -
+    per sample cost stays flat for the tabular form and grows with the batch size for the image form
+
+    the image form feeds (batch, 1, batch, features) interpolates, which the built critic model rejects -
+    it gets the same critic as a layer stack
+    """
+    from train_wasserstein_generator import create_discriminator_network, gradient_penalty
+
+    discriminator_model = create_discriminator_network(number_hidden_layers=2)
+    discriminator_model.build(input_shape=(None, number_features))
+    rng = tf.random.Generator.from_seed(42)
+
+    print(f'{"penalty":>8} {"batch":>6} {"interpolated":>13} {"ms/call":>9} {"us/sample":>10}')
+
+    results = []
+    for image_penalty in (False, True):
+        critic = layer_stack(discriminator_model) if image_penalty else discriminator_model
+        penalty = tf.function(
+            lambda real, fake: gradient_penalty(
+                critic, real, fake, rng=rng, image_penalty=image_penalty))
+
+        for batch_size in batch_sizes:
+            real = rng.normal(shape=(batch_size, number_features))
+            fake = rng.normal(shape=(batch_size, number_features))
+
+            seconds = time_function(penalty, real, fake, repeats=repeats)
+            interpolated_size = batch_size * number_features * (batch_size if image_penalty else 1)
+
+            row = {
+                'penalty': 'image' if image_penalty else 'tabular',
+                'batch_size': batch_size,
+                'interpolated_elements': interpolated_size,
+                'ms_per_call': seconds * 1000,
+                'us_per_sample': seconds * 1e6 / batch_size}
+            results.append(row)
+
+            # printed as it completes, the large image batches take a while
+            print(
+                '{penalty:>8} {batch_size:>6d} {interpolated_elements:>13d} '
+                '{ms_per_call:>9.3f} {us_per_sample:>10.3f}'.format(**row), flush=True)
+
+    return results
+
+
+def benchmark_model_formats(
+    h5_path: str = '../models/best_generator.h5',
+    batch_sizes: tuple = (1, 256, 16384),
+    repeats: int = 20) -> list:
+    """
+    exports one generator to every format and compares cold load (load + first call), per sample latency (batch 1)
+    and throughput at larger batches on cpu - .h5 runs through a tf.function like generate_data, the numpy engine
+    is the bn folded float32 one
+    """
+    from model_export import export_generator, TFLiteGenerator
+    from numpy_generator import NumpyGenerator
+
+    def load_keras(path):
+        model = tf.keras.models.load_model(path, compile=False)
+
+        return tf.function(lambda noise: model(noise, training=False))
+
+    def load_saved_model(path):
+        serve = tf.saved_model.load(path).signatures['serving_default']
+
+        return lambda noise: serve(noise=tf.constant(noise))['samples']
+
+    paths = export_generator(h5_path, directory=tempfile.mkdtemp())
+    paths['numpy'] = h5_path
+
+    loaders = {'h5': load_keras, 'saved_model': load_saved_model, 'numpy': NumpyGenerator.from_h5}
+    rng = np.random.default_rng(0)
+
+    results = []
+    for format_name, path in paths.items():
+        loader = loaders.get(format_name, TFLiteGenerator)
+        latent_space_shape = NumpyGenerator.from_h5(h5_path).latent_space_shape
+
+        start_time = time.perf_counter()
+        generator = loader(path)
+        np.asarray(generator(rng.standard_normal((1, latent_space_shape), dtype=np.float32)))
+        load_seconds = time.perf_counter() - start_time
+
+        row = {'format': format_name, 'load_ms': load_seconds * 1000}
+        for batch_size in batch_sizes:
+            noise = rng.standard_normal((batch_size, latent_space_shape), dtype=np.float32)
+            row[batch_size] = time_function(generator, noise, repeats=repeats) * 1e6 / batch_size
+
+        results.append(row)
+
+    print(f'{"format":>16} {"load ms":>9} ' + ' '.join(f'{f"us/sample@{b}":>16}' for b in batch_sizes))
+    for row in results:
+        print(f'{row["format"]:>16} {row["load_ms"]:>9.1f} ' + ' '.join(f'{row[b]:>16.3f}' for b in batch_sizes))
+
+    return results
+
+
+def benchmark_distillation(
+    name: str = 'generator_e_50_gl_3_gu_128_dl_3_du_128.h5',
+    student_shapes: tuple = ((1, 5), (2, 5), (1, 6)),
+    n_steps: int = 5000) -> list:
+    # teacher fidelity and sampling speedup per student shape (hidden layers, units power) - students are not exported
+    from distill_generator import distill_model
+
+    results = []
+    for number_hidden_layers, number_hidden_units_power in student_shapes:
+        result = distill_model(
+            name,
+            number_hidden_layers=number_hidden_layers,
+            number_hidden_units_power=number_hidden_units_power,
+            n_steps=n_steps,
+            export_student=False)
+        results.append({
+            'student': (number_hidden_layers, 2 ** number_hidden_units_power), **result['fidelity'], **result['sampling']})
+
+    return results
+
+
+benchmarks = {
+    'gradient_penalty': benchmark_gradient_penalty,
+    'model_formats': benchmark_model_formats,
+    'distillation': benchmark_distillation}
+
+
+if __name__ == '__main__':
+
+    # run single benchmarks by name, e.g. python benchmarks.py gradient_penalty - defaults to all of them
+    selected = sys.argv[1:] or list(benchmarks)
+
+    for name in selected:
+        print()
+        print(f'benchmark: {name}')
+        benchmarks[name]()
@@ -0,0 +1,158 @@
+import numpy as np
+import tensorflow as tf
+from generate_data import generate_batches, inference_function
+from dtype_policy import floatx, label_dtype
+
+
+def critic_scores(
+    critic: tf.keras.Model,
+    x: np.ndarray,
+    y: np.ndarray) -> np.ndarray:
+    # one vectorized critic pass over (features, label) rows, like the critic saw them in training -
+    # higher is more real for the dcgan logits and the wasserstein critic alike
+    rows = np.column_stack((x, y)).astype(np.float32)
+    score = inference_function(critic, None, rows.shape[1])
+
+    return score(rows).numpy()[:, 0]
+
+
+class StreamingTopK:
+    """
+    the k highest scored rows of a stream of chunks, memory is bounded by k plus one chunk
+
+    every update concatenates the current top k with the new chunk and partitions it back to k rows (np.partition,
+    linear in k + chunk size, ties at the cut go to the earlier rows) - result() sorts the survivors by score,
+    ties by position in the stream, so it is the head of a stable sort of all scores
+    """
+
+    def __init__(self, k: int):
+        assert k > 0, f'k needs to be positive - got {k}'
+
+        self.k = k
+        self.scores = None
+        self.x = None
+        self.y = None
+        self.index = None
+
+    def update(
+        self,
+        scores: np.ndarray,
+        x: np.ndarray,
+        y: np.ndarray,
+        index: np.ndarray):
+
+        if self.scores is not None:
+            scores = np.concatenate((self.scores, scores))
+            x = np.concatenate((self.x, x))
+            y = np.concatenate((self.y, y))
+            index = np.concatenate((self.index, index))
+
+        if scores.shape[0] > self.k:
+            # rows tied with the k-th highest score are kept by position in the stream, like a stable sort keeps them
+            kth = -np.partition(-scores, self.k - 1)[self.k - 1]
+            above = np.flatnonzero(scores > kth)
+            tied = np.flatnonzero(scores == kth)
+            tied = tied[np.argsort(index[tied], kind='stable')[:self.k - above.shape[0]]]
+            keep = np.concatenate((above, tied))
+            scores, x, y, index = scores[keep], x[keep], y[keep], index[keep]
+
+        self.scores, self.x, self.y, self.index = scores, x, y, index
+
+    def result(self) -> dict:
+        if self.scores is None:
+            return None
+
+        order = np.lexsort((self.index, -self.scores))
+
+        result = {
+            'x_train': self.x[order],
+            'y_train': self.y[order],
+            'scores': self.scores[order],
+            'index': self.index[order]}
+
+        return result
+
+
+def filter_batches(
+    critic: tf.keras.Model,
+    batches,
+    top_k: int = None,
+    threshold: float = None) -> dict:
+    """
+    scores a stream of {'x_train', 'y_train'} chunks (e.g. generate_batches) with a trained critic and keeps
+    the samples scored at least threshold, then the top_k best of those - either or both can be set
+
+    with top_k only the current best k rows are held, so the pool can be much larger than memory -
+    returns the kept samples best first, their scores, their row index in the stream and the number scored
+    """
+
+    assert top_k is not None or threshold is not None, 'need top_k, threshold or both'
+
+    top = StreamingTopK(top_k) if top_k is not None else None
+    kept = []
+    start = 0
+
+    for chunk in batches:
+        x, y = chunk['x_train'], chunk['y_train']
+        scores = critic_scores(critic, x, y)
+        index = np.arange(start, start + scores.shape[0])
+        start += scores.shape[0]
+
+        if threshold is not None:
+            mask = scores >= threshold
+            scores, x, y, index = scores[mask], x[mask], y[mask], index[mask]
+
+        if top is not None:
+            top.update(scores, x, y, index)
+        else:
+            kept.append((scores, x, y, index))
+
+    if top is not None:
+        result = top.result()
+
+    elif kept:
+        scores, x, y, index = (np.concatenate(values) for values in zip(*kept))
+        order = np.lexsort((index, -scores))
+        result = {'x_train': x[order], 'y_train': y[order], 'scores': scores[order], 'index': index[order]}
+
+    else:
+        result = None
+
+    if result is None:
+        # nothing passed the threshold
+        result = {
+            'x_train': np.empty((0, critic.input_shape[-1] - 1), dtype=floatx()),
+            'y_train': np.empty(0, dtype=label_dtype),
+            'scores': np.empty(0, dtype=np.float32),
+            'index': np.empty(0, dtype=np.int64)}
+
+    result['number_scored'] = start
+
+    return result
+
+
+def filter_generated(
+    generator: tf.keras.Model,
+    critic: tf.keras.Model,
+    number_samples: int = 50,
+    top_k: int = None,
+    threshold: float = None,
+    latent_space_shape: int = 8,
+    seed: int = 42,
+    latent_space_mode: str = 'normal',
+    chunk_size: int = 4096,
+    labels: np.ndarray = None) -> dict:
+    # generates a pool of number_samples and filters it chunk by chunk - the pool itself is never held in memory
+
+    return filter_batches(
+        critic,
+        generate_batches(
+            generator,
+            latent_space_shape=latent_space_shape,
+            number_samples=number_samples,
+            chunk_size=chunk_size,
+            seed=seed,
+            latent_space_mode=latent_space_mode,
+            labels=labels),
+        top_k=top_k,
+        threshold=threshold)
@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import shutil
+import pickle
+import inspect
+import hashlib
+import collections.abc
+import numpy as np
+import sklearn
+from dtype_policy import floatx
+
+
+artifacts_root = os.path.relpath('../cache/datasets')
+
+
+def file_sha256(path: str, block_size: int = 2 ** 20) -> str:
+    digest = hashlib.sha256()
+
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def source_modules(function) -> list:
+    # the module of function and, recursively, every module next to it that it takes names from -
+    # the code a build runs besides installed packages, e.g. datasets -> process_data -> dtype_policy
+    root = os.path.dirname(os.path.abspath(inspect.getsourcefile(function)))
+    pending = [inspect.getmodule(function)]
+    modules = {}
+
+    while pending:
+        module = pending.pop()
+        path = os.path.abspath(module.__file__)
+
+        if path in modules:
+            continue
+        modules[path] = module
+
+        for value in vars(module).values():
+            dependency = value if inspect.ismodule(value) else inspect.getmodule(value)
+
+            if getattr(dependency, '__file__', None) and os.path.dirname(os.path.abspath(dependency.__file__)) == root:
+                pending.append(dependency)
+
+    return [modules[path] for path in sorted(modules)]
+
+
+def _process_alive(pid: int) -> bool:
+    if os.name != 'posix':
+        # no cheap liveness check, temporary entries are only removed by age there
+        return True
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+
+    return True
+
+
+class DatasetArtifact:
+    """
+    preprocessed dataset built once and reused from disk, keyed by a fingerprint of everything that goes into it -
+    the source files, the preprocessing config, the source code of the build function's module and of the modules
+    next to it that it uses (see source_modules), the numpy / sklearn versions and the float dtype policy
+
+    numeric arrays are stored as .npy and opened as read only memmaps, everything else (fitted pipelines,
+    object arrays) in one pickle - an entry is written under a temporary name and renamed when complete,
+    entries of the same name with an older fingerprint are removed once a new one is built, together with
+    temporary entries left by interrupted builds (their process is gone, or older than temporary_timeout)
+
+    build functions with a directory parameter get the temporary entry - out of core builds write their arrays
+    there as <key>.npy memmaps, which are then kept as they are instead of being saved a second time
+    """
+
+    temporary_timeout = 24 * 3600
+
+    def __init__(
+        self,
+        name: str,
+        build,
+        sources: tuple = (),
+        config: dict = None,
+        directory: str = artifacts_root):
+
+        self.name = name
+        self.build = build
+        self.sources = tuple(sources)
+        self.config = config or {}
+        self.directory = directory
+
+    def fingerprint(self) -> str:
+        params = {
+            'sources': {os.path.basename(path): file_sha256(path) for path in self.sources},
+            'config': self.config,
+            'build': self.build.__name__,
+            'code': {os.path.basename(module.__file__): file_sha256(module.__file__) for module in source_modules(self.build)},
+            'versions': {'numpy': np.__version__, 'sklearn': sklearn.__version__},
+            'floatx': np.dtype(floatx()).name}
+
+        return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _entry(self, fingerprint: str) -> str:
+        return os.path.join(self.directory, f'{self.name}-{fingerprint[:16]}')
+
+    def _temporary(self, fingerprint: str) -> str:
+        return f'{self._entry(fingerprint)}.tmp-{os.getpid()}'
+
+    def _stale(self, entry: str, keep: str) -> bool:
+        # older fingerprints of this name, and temporary entries whose build was interrupted
+        base, _, pid = entry.partition('.tmp-')
+
+        if base.rsplit('-', 1)[0] != self.name or entry == keep:
+            return False
+
+        if not pid:
+            return True
+
+        age = time.time() - os.path.getmtime(os.path.join(self.directory, entry))
+
+        return not _process_alive(int(pid)) or age > self.temporary_timeout
+
+    def load(self) -> dict:
+        fingerprint = self.fingerprint()
+        entry = self._entry(fingerprint)
+
+        if not os.path.exists(os.path.join(entry, 'manifest.json')):
+            print(f'building dataset artifact {self.name} ({fingerprint[:12]})')
+            config = dict(self.config)
+
+            if 'directory' in inspect.signature(self.build).parameters:
+                config['directory'] = self._temporary(fingerprint)
+                os.makedirs(config['directory'], exist_ok=True)
+
+            self.save(self.build(**config), fingerprint)
+
+        return self.read(entry)
+
+    def save(
+        self,
+        data: dict,
+        fingerprint: str):
+
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = self._temporary(fingerprint)
+        os.makedirs(temporary, exist_ok=True)
+
+        arrays = [
+            key for key, value in data.items()
+            if isinstance(value, np.ndarray) and value.dtype.kind in 'biuf']
+        objects = {key: value for key, value in data.items() if key not in arrays}
+
+        for key in arrays:
+            path = os.path.join(temporary, f'{key}.npy')
+
+            # written in place by the build function
+            if isinstance(data[key], np.memmap) and os.path.abspath(data[key].filename) == os.path.abspath(path):
+                data[key].flush()
+                continue
+
+            np.save(path, data[key])
+
+        with open(os.path.join(temporary, 'objects.pkl'), 'wb') as f:
+            pickle.dump(objects, f)
+
+        manifest = {
+            'name': self.name,
+            'fingerprint': fingerprint,
+            'created': time.time(),
+            'keys': list(data),
+            'arrays': arrays}
+
+        with open(os.path.join(temporary, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f)
+
+        # another process may have built the same entry in the meantime - both are identical, keep theirs
+        try:
+            os.rename(temporary, self._entry(fingerprint))
+        except OSError:
+            shutil.rmtree(temporary, ignore_errors=True)
+
+        for entry in os.listdir(self.directory):
+            if self._stale(entry, keep=os.path.basename(self._entry(fingerprint))):
+                shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
+
+    def read(self, entry: str) -> dict:
+        with open(os.path.join(entry, 'manifest.json')) as f:
+            manifest = json.load(f)
+
+        with open(os.path.join(entry, 'objects.pkl'), 'rb') as f:
+            objects = pickle.load(f)
+
+        # in the key order of the build function
+        result = {
+            key: np.load(os.path.join(entry, f'{key}.npy'), mmap_mode='r') if key in manifest['arrays'] else objects[key]
+            for key in manifest['keys']}
+
+        return result
+
+    def lazy(self) -> 'LazyDataset':
+        return LazyDataset(self)
+
+
+class LazyDataset(collections.abc.Mapping):
+    # read only dict view of an artifact - nothing is fingerprinted, built or read before the first access
+
+    def __init__(self, artifact: DatasetArtifact):
+        self.artifact = artifact
+        self._data = None
+
+    @property
+    def data(self) -> dict:
+        if self._data is None:
+            self._data = self.artifact.load()
+
+        return self._data
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
@@ -0,0 +1,346 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.experimental import enable_iterative_imputer
+from sklearn.impute import IterativeImputer
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from dataset_artifacts import DatasetArtifact, LazyDataset
+from process_data import FittedPreprocessor, load_processed_data
+from dtype_policy import floatx, label_dtype
+
+
+data_root = os.path.relpath('../data')
+
+# one schema per dataset - categorical columns are read as category, numeric ones in the float policy (float32),
+# the label as int8
+# label_threshold turns a numeric target into the binary label (label >= threshold),
+# missing_zero lists columns where 0 is a missing measurement
+schemas = {
+    'titanic': {
+        'file': 'titanic.csv',
+        'label': 'survived',
+        'categorical': ['sex', 'embarked'],
+        'numeric': ['pclass', 'age', 'sibsp', 'parch', 'fare']},
+    'diabetes': {
+        'file': 'diabetes.csv',
+        'label': 'Outcome',
+        'categorical': [],
+        'numeric': [
+            'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'BMI',
+            'DiabetesPedigreeFunction', 'Age'],
+        'missing_zero': ['Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'BMI']},
+    'winequality': {
+        'file': 'winequalityN.csv',
+        'label': 'quality',
+        'label_threshold': 7,
+        'categorical': ['type'],
+        'numeric': [
+            'fixed acidity', 'volatile acidity', 'citric acid', 'residual sugar', 'chlorides',
+            'free sulfur dioxide', 'total sulfur dioxide', 'density', 'pH', 'sulphates', 'alcohol']},
+    'messidor': {
+        'file': 'messidor_features.arff',
+        'label': 'Class',
+        'categorical': [],
+        'numeric': [str(i) for i in range(19)]}}
+
+
+def read_options(schema: dict) -> dict:
+    # pd.read_csv arguments for the columns and compact dtypes of a schema
+    options = {
+        'usecols': schema['categorical'] + schema['numeric'] + [schema['label']],
+        'dtype': {**{c: 'category' for c in schema['categorical']}, **{c: floatx() for c in schema['numeric']}}}
+
+    return options
+
+
+def clean_frame(
+    df: pd.DataFrame,
+    schema: dict) -> pd.DataFrame:
+    # rows without a label dropped, missing measurements masked, binary int8 label last - keeps the row index
+    df = df.dropna(subset=[schema['label']])
+    df[schema['numeric']] = df[schema['numeric']].astype(floatx())
+
+    for column in schema.get('missing_zero', []):
+        df[column] = df[column].mask(df[column] == 0)
+
+    label = df.pop(schema['label'])
+    if 'label_threshold' in schema:
+        label = label >= schema['label_threshold']
+    df[schema['label']] = label.astype(label_dtype)
+
+    return df
+
+
+def load_dataset(name: str) -> pd.DataFrame:
+    # raw features and label with the compact dtypes of the schema, rows without a label are dropped
+    assert name in schemas, f'dataset needs to be one of {list(schemas)} - got {name}'
+
+    schema = schemas[name]
+    path = os.path.join(data_root, schema['file'])
+    columns = schema['categorical'] + schema['numeric']
+
+    if path.endswith('.arff'):
+        from scipy.io.arff import loadarff
+
+        df = pd.DataFrame(loadarff(path)[0])
+        # nominal arff attributes come as bytes
+        df[schema['label']] = pd.to_numeric(df[schema['label']].str.decode('utf-8'))
+        df = df[columns + [schema['label']]]
+
+    else:
+        df = pd.read_csv(path, **read_options(schema))
+
+    return clean_frame(df, schema).reset_index(drop=True)
+
+
+def update_vocabularies(
+    vocabularies: dict,
+    x: pd.DataFrame) -> dict:
+    # known values per categorical column, a missing value kept as np.nan - the category OneHotEncoder makes of it
+    for column, vocabulary in vocabularies.items():
+        vocabulary.update(x[column].dropna().unique())
+        if x[column].isna().any():
+            vocabulary.add(np.nan)
+
+    return vocabularies
+
+
+def onehot_categories(vocabularies: dict) -> list:
+    # sorted with np.nan last, the order OneHotEncoder gives the categories it finds when fitted in memory
+    return [
+        sorted(value for value in vocabulary if value is not np.nan) + [np.nan] * (np.nan in vocabulary)
+        for vocabulary in vocabularies.values()]
+
+
+def process_dataset(
+    name: str,
+    schema: dict = None,
+    test_size: float = .2,
+    random_state: int = 42) -> dict:
+    """
+    process_data for any dataset in schemas - one hot categories, standardized numeric columns, iterative imputation,
+    fitted on the training split only - same keys as process_data, features in the float policy and labels int8
+    """
+
+    schema = schema or schemas[name]
+    df = load_dataset(name)
+    y = df.pop(schema['label'])
+    x_train, x_test, y_train, y_test = train_test_split(df, y, random_state=random_state, test_size=test_size)
+
+    transformers = [('normally distributed', StandardScaler(), schema['numeric'])]
+    if schema['categorical']:
+        # the vocabularies of process_dataset_chunked, so both give the same layout
+        categories = onehot_categories(update_vocabularies({column: set() for column in schema['categorical']}, x_train))
+        transformers.insert(0, (
+            'onehotencode categories',
+            OneHotEncoder(categories=categories, handle_unknown='ignore'),
+            schema['categorical']))
+
+    pipeline = Pipeline([
+        ('transform', ColumnTransformer(transformers, remainder='drop', sparse_threshold=0)),
+        ('impute', IterativeImputer())])
+    pipeline.fit(x_train)
+    preprocessor = FittedPreprocessor(pipeline, label_column=schema['label'])
+
+    result = {
+        'x_train': x_train,
+        'x_train_processed': preprocessor.transform(x_train),
+        'x_test': x_test,
+        'x_test_processed': preprocessor.transform(x_test),
+        'y_train': y_train.values,
+        'y_test': y_test.values,
+        'pipeline': pipeline,
+        'preprocessor': preprocessor}
+
+    return result
+
+
+def row_uniform(
+    index: np.ndarray,
+    seed: int) -> np.ndarray:
+    # uniform [0, 1) per row index (splitmix64) - the same value for a row whatever chunk it is read in
+    with np.errstate(over='ignore'):
+        # wrapping uint64 arithmetic is the point
+        z = index.astype(np.uint64) + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+
+    return (z >> np.uint64(11)) * 2. ** -53
+
+
+def process_dataset_chunked(
+    name: str,
+    schema: dict = None,
+    test_size: float = .2,
+    random_state: int = 42,
+    chunk_size: int = 100_000,
+    imputer_samples: int = 50_000,
+    directory: str = None) -> dict:
+    """
+    process_dataset for csv files larger than memory, in two passes over pd.read_csv(chunksize=chunk_size)
+
+    the first pass assigns every row to a split by a hash of its row index (about test_size of the rows end up in test,
+    independent of chunk_size), partial_fits the scaler, gathers the category vocabularies and keeps a bounded
+    uniform sample of imputer_samples training rows (the rows with the smallest hash keys) to fit the imputer on -
+    the second pass transforms chunk by chunk into .npy memmaps in directory (a new temporary directory by default)
+
+    same keys as process_dataset without the raw x_train / x_test frames, memory is bounded by chunk_size and
+    imputer_samples rows
+    """
+
+    schema = schema or schemas[name]
+    path = os.path.join(data_root, schema['file'])
+    assert not path.endswith('.arff'), 'chunked processing reads csv files only'
+
+    def chunks():
+        for chunk in pd.read_csv(path, chunksize=chunk_size, **read_options(schema)):
+            chunk = clean_frame(chunk, schema)
+            # the row index of read_csv continues across chunks
+            test = row_uniform(chunk.index.values, random_state) < test_size
+            yield chunk.drop(columns=schema['label']), chunk[schema['label']].values, test
+
+    # first pass - split sizes, scaler statistics, vocabularies and the imputer sample
+    scaler = StandardScaler()
+    vocabularies = {column: set() for column in schema['categorical']}
+    sample, sample_keys = None, None
+    number_train, number_test = 0, 0
+
+    for x, y, test in chunks():
+        number_train += int((~test).sum())
+        number_test += int(test.sum())
+        x = x[~test]
+
+        if x.empty:
+            continue
+
+        scaler.partial_fit(x[schema['numeric']])
+
+        update_vocabularies(vocabularies, x)
+
+        keys = row_uniform(x.index.values, random_state + 1)
+        if sample is not None:
+            x, keys = pd.concat((sample, x)), np.concatenate((sample_keys, keys))
+        if keys.shape[0] > imputer_samples:
+            keep = np.argpartition(keys, imputer_samples - 1)[:imputer_samples]
+            x, keys = x.iloc[keep], keys[keep]
+        sample, sample_keys = x, keys
+
+    assert number_train > 0, f'no training rows in {path}'
+    sample = sample.sort_index()
+
+    transformers = [('normally distributed', StandardScaler(), schema['numeric'])]
+    if schema['categorical']:
+        categories = onehot_categories(vocabularies)
+        transformers.insert(0, (
+            'onehotencode categories',
+            OneHotEncoder(categories=categories, handle_unknown='ignore'),
+            schema['categorical']))
+
+    transform = ColumnTransformer(transformers, remainder='drop', sparse_threshold=0)
+    transform.fit(sample)
+    # the scaler statistics of all training rows instead of those of the sample
+    transform.transformers_ = [
+        (label, scaler if label == 'normally distributed' else transformer, columns)
+        for label, transformer, columns in transform.transformers_]
+
+    imputer = IterativeImputer()
+    imputer.fit(transform.transform(sample))
+
+    pipeline = Pipeline([('transform', transform), ('impute', imputer)])
+    preprocessor = FittedPreprocessor(pipeline, label_column=schema['label'])
+    number_features = preprocessor.transform(sample.iloc[:1]).shape[1]
+
+    # second pass - every chunk transformed and written at the running offset of its split
+    directory = directory or tempfile.mkdtemp(prefix=f'{name}-')
+    os.makedirs(directory, exist_ok=True)
+    result = {}
+    offsets = {}
+
+    for split, number_rows in (('train', number_train), ('test', number_test)):
+        result[f'x_{split}_processed'] = np.lib.format.open_memmap(
+            os.path.join(directory, f'x_{split}_processed.npy'), mode='w+', dtype=floatx(), shape=(number_rows, number_features))
+        result[f'y_{split}'] = np.lib.format.open_memmap(
+            os.path.join(directory, f'y_{split}.npy'), mode='w+', dtype=label_dtype, shape=(number_rows,))
+        offsets[split] = 0
+
+    for x, y, test in chunks():
+        for split, mask in (('train', ~test), ('test', test)):
+            number_rows = int(mask.sum())
+            if number_rows == 0:
+                continue
+
+            start = offsets[split]
+            result[f'x_{split}_processed'][start:start + number_rows] = preprocessor.transform(x[mask])
+            result[f'y_{split}'][start:start + number_rows] = y[mask]
+            offsets[split] += number_rows
+
+    for array in result.values():
+        array.flush()
+
+    result['pipeline'] = pipeline
+    result['preprocessor'] = preprocessor
+
+    return result
+
+
+def load_processed(
+    name: str,
+    chunk_size: int = None,
+    imputer_samples: int = 50_000) -> LazyDataset:
+    """
+    processed splits of a dataset from the artifact cache, read on first access -
+    titanic keeps process_data (its feature engineering and the layout the pre-trained generators expect)
+
+    with chunk_size, csv datasets are processed out of core by process_dataset_chunked, titanic included
+    (then with the generic schema pipeline)
+    """
+
+    if name == 'titanic' and chunk_size is None:
+        return load_processed_data()
+
+    if chunk_size is None:
+        build, config = process_dataset, {}
+    else:
+        build, config = process_dataset_chunked, {'chunk_size': chunk_size, 'imputer_samples': imputer_samples}
+
+    artifact = DatasetArtifact(
+        name if chunk_size is None else f'{name}-chunked',
+        build=build,
+        sources=(os.path.join(data_root, schemas[name]['file']),),
+        config={'name': name, 'schema': schemas[name], **config})
+
+    return artifact.lazy()
+
+
+def memory_per_row(name: str) -> dict:
+    # bytes per row of the schema frame and of a default pandas read of the same columns
+    schema = schemas[name]
+    compact = load_dataset(name)
+
+    if schema['file'].endswith('.arff'):
+        from scipy.io.arff import loadarff
+
+        default = pd.DataFrame(loadarff(os.path.join(data_root, schema['file']))[0])
+    else:
+        default = pd.read_csv(
+            os.path.join(data_root, schema['file']), usecols=schema['categorical'] + schema['numeric'] + [schema['label']])
+
+    result = {
+        'default': default.memory_usage(deep=True).sum() / len(default),
+        'compact': compact.memory_usage(deep=True).sum() / len(compact)}
+
+    return result
+
+
+if __name__ == '__main__':
+
+    for name in schemas:
+        memory = memory_per_row(name)
+        data = load_processed(name)
+        print(f'{name:>12} {data["x_train_processed"].shape} train rows '
+              f'| {memory["default"]:.0f} -> {memory["compact"]:.0f} bytes per raw row')
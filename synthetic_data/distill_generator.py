@@ -0,0 +1,164 @@
+import os
+import sys
+import time
+import numpy as np
+import tensorflow as tf
+from generate_data import generate_data, latent_block
+from gan_early_stopping import column_wasserstein
+from gan_artifacts import export_model
+from generator_registry import registry
+
+
+def create_student_network(
+    latent_space_shape: int = 8,
+    number_output_units: int = 12,
+    number_hidden_layers: int = 1,
+    number_hidden_units_power: int = 5,
+    hidden_activation_function: str = 'selu',
+    output_activation_function: str = 'tanh') -> tf.keras.Model:
+    # plain dense stack with the output activation of the teachers - no batchnorm or dropout, nothing to fold at inference
+
+    model = tf.keras.Sequential()
+    for _ in range(number_hidden_layers):
+        model.add(tf.keras.layers.Dense(2 ** number_hidden_units_power, activation=hidden_activation_function))
+
+    model.add(tf.keras.layers.Dense(number_output_units, activation=output_activation_function))
+    model.build(input_shape=(None, latent_space_shape))
+
+    return model
+
+
+def distill_generator(
+    teacher: tf.keras.Model,
+    student: tf.keras.Model = None,
+    n_steps: int = 5000,
+    batch_size: int = 512,
+    learning_rate: float = 0.001,
+    latent_space_mode: str = 'normal',
+    seed: int = 42,
+    verbose: bool = True) -> tf.keras.Model:
+    """
+    trains student to reproduce the latent -> sample mapping of teacher, mean squared error on the teacher output
+
+    every step draws a fresh latent batch (seed, step) and labels it with teacher(noise, training=False),
+    so the student never sees the same batch twice and the run only depends on seed
+    """
+
+    latent_space_shape = teacher.input_shape[-1]
+    if student is None:
+        student = create_student_network(latent_space_shape, teacher.output_shape[-1])
+
+    assert student.input_shape[-1] == latent_space_shape, 'student and teacher need the same latent space shape'
+
+    optimizer = tf.keras.optimizers.Adam(learning_rate=learning_rate)
+
+    @tf.function
+    def train_step(noise):
+        target = teacher(noise, training=False)
+
+        with tf.GradientTape() as tape:
+            loss = tf.reduce_mean(tf.square(student(noise, training=True) - target))
+
+        grads = tape.gradient(loss, student.trainable_variables)
+        optimizer.apply_gradients(zip(grads, student.trainable_variables))
+
+        return loss
+
+    start_time = time.time()
+    for step in range(n_steps):
+        loss = train_step(latent_block(seed, step, batch_size, latent_space_shape, latent_space_mode))
+
+        if verbose and (step + 1) % max(n_steps // 10, 1) == 0:
+            print(f'Step {step + 1:6d} | ET {(time.time() - start_time) / 60:.2f} min | distillation mse {float(loss):.6f}')
+
+    return student
+
+
+def distillation_fidelity(
+    teacher: tf.keras.Model,
+    student: tf.keras.Model,
+    number_samples: int = 10000,
+    latent_space_mode: str = 'normal',
+    seed: int = 0) -> dict:
+    # both models on the same noise - row wise errors, agreement of the thresholded label and the distribution distance
+    # a block index the distillation steps never reach, so the noise is held out from training
+    noise = latent_block(seed, sys.maxsize, number_samples, teacher.input_shape[-1], latent_space_mode)
+    teacher_output = teacher(noise, training=False).numpy()
+    student_output = student(noise, training=False).numpy()
+    errors = np.abs(teacher_output - student_output)
+
+    result = {
+        'mean_abs_error': float(errors.mean()),
+        'max_abs_error': float(errors.max()),
+        'label_agreement': float(np.mean((teacher_output[:, -1] < 0) == (student_output[:, -1] < 0))),
+        'column_wasserstein': float(column_wasserstein(teacher_output, student_output).mean())}
+
+    return result
+
+
+def sampling_speedup(
+    teacher: tf.keras.Model,
+    student: tf.keras.Model,
+    number_samples: int = 65536,
+    repeats: int = 5) -> dict:
+    # generate_data wall time of both models, after a warm up call that traces the inference functions
+    from benchmarks import time_function
+
+    latent_space_shape = teacher.input_shape[-1]
+    sample = lambda model: generate_data(model, latent_space_shape, number_samples=number_samples, seed=0)['x_train']
+
+    teacher_seconds = time_function(sample, teacher, repeats=repeats)
+    student_seconds = time_function(sample, student, repeats=repeats)
+
+    result = {
+        'teacher_us_per_sample': teacher_seconds * 1e6 / number_samples,
+        'student_us_per_sample': student_seconds * 1e6 / number_samples,
+        'speedup': teacher_seconds / student_seconds}
+
+    return result
+
+
+def distill_model(
+    name: str,
+    number_hidden_layers: int = 1,
+    number_hidden_units_power: int = 5,
+    n_steps: int = 5000,
+    seed: int = 42,
+    export_student: bool = True) -> dict:
+    """
+    distills the generator ../models/<name> into a student, reports fidelity and sampling speedup and
+    exports it as ../models/distilled_<name> - registered right away, so registry.get on that name
+    returns the warm student, a drop in for the teacher in generate_data and enhance_data
+    """
+
+    teacher = registry.get(name)
+    student = create_student_network(
+        latent_space_shape=teacher.input_shape[-1],
+        number_output_units=teacher.output_shape[-1],
+        number_hidden_layers=number_hidden_layers,
+        number_hidden_units_power=number_hidden_units_power)
+
+    student = distill_generator(teacher, student, n_steps=n_steps, seed=seed)
+
+    result = {
+        'teacher': teacher,
+        'student': student,
+        'fidelity': distillation_fidelity(teacher, student),
+        'sampling': sampling_speedup(teacher, student)}
+
+    if export_student:
+        result['name'] = f'distilled_{name}'
+        export_model(student, os.path.join(registry.directory, result['name']))
+        result['student'] = registry.get(result['name'])
+
+    print(f'{name} -> {number_hidden_layers} x {2 ** number_hidden_units_power} units')
+    for k, v in {**result['fidelity'], **result['sampling']}.items():
+        print(f'{k:>24} {v:.4f}')
+
+    return result
+
+
+if __name__ == '__main__':
+
+    for name in sys.argv[1:] or ['generator_e_50_gl_3_gu_128_dl_3_du_128.h5', 'generator_e_100_gl_5_gu_100_dl_5_du_100.h5']:
+        distill_model(name)
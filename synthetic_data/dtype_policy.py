@@ -0,0 +1,24 @@
+import numpy as np
+
+
+# dtype of the feature arrays from preprocessing to training - the keras models compute in float32,
+# float64 arrays only double memory and bandwidth and get cast on every batch
+_floatx = np.float32
+
+# binary labels
+label_dtype = np.int8
+
+
+def floatx() -> type:
+    return _floatx
+
+
+def set_floatx(dtype):
+    # e.g. set_floatx('float64') before anything is preprocessed - cached dataset artifacts are keyed by it
+    global _floatx
+    _floatx = np.dtype(dtype).type
+
+
+def as_floatx(array) -> np.ndarray:
+    # no copy if the array already has the policy dtype
+    return np.asarray(array, dtype=_floatx)
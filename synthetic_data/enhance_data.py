@@ -1,32 +1,67 @@
 import numpy as np
 import tensorflow as tf
-from process_data import process_data
+from datasets import load_processed
 from generate_data import generate_data
+from critic_filter import filter_generated
+from synthetic_cache import SyntheticCache
+from generator_registry import registry
+from rng_streams import RandomStreams
+from dtype_policy import as_floatx
 from train_generator import train_generator
 from train_wasserstein_generator import train_generator as train_wasserstein_generator
 
 
-data = process_data()
+synthetic_cache = SyntheticCache()
 
 
 def enhance_data(
-    x_train: np.array = data['x_train_processed'],
-    y_train: np.array = data['y_train'],
+    x_train: np.array = None,
+    y_train: np.array = None,
+    dataset: str='titanic',
+    dataset_chunk_size: int=None,
     include_synthetic: bool=True,
     force_generator: bool=False,
     generator_epochs: int=40,
     synthetic_share: float=0.2,
     wasserstein: bool=False,
     replace_real_data: bool=False,
-    real_share: float=1.0) -> dict:
+    real_share: float=1.0,
+    synthetic_seed: int=42,
+    cache_synthetic: bool=True,
+    critic_keep_share: float=None,
+    streams: RandomStreams=None,
+    synthetic_workers: int=1) -> dict:
     
     assert real_share <= 1, 'can only take 100% of all real data'
+    
+    # the processed training split of dataset by default, read from the artifact cache on the first call -
+    # with dataset_chunk_size it is preprocessed out of core and comes as memmaps
+    if x_train is None:
+        data = load_processed(dataset, chunk_size=dataset_chunk_size)
+        x_train, y_train = data['x_train_processed'], data['y_train']
+    
+    # float policy dtype, no copy if it already is
+    x_train = as_floatx(x_train)
+    
+    # pre-trained generators only exist for titanic, the other datasets always get a new one
+    new_generator = real_share < 1 or force_generator or dataset != 'titanic' or dataset_chunk_size is not None
+    
+    # critic filtering needs the critic of a generator trained here, the pre-trained generators come without one
+    assert critic_keep_share is None or new_generator, 'critic_keep_share needs a newly trained generator'
+    
+    critic = None
+    
+    # with streams, subsampling, generator training, synthetic samples and the shuffle each get their own stream -
+    # without, they draw from np.random and depend on everything that ran before
+    if streams is not None:
+        synthetic_seed = streams.stream('synthetic').seed()
 
     if real_share != 1.0:
         # shorten real data
         number_real_samples = int(x_train.shape[0] * real_share)
         # create permutation index in order to not just omit last samples in order
-        real_permutated_index = np.random.permutation(x_train.shape[0])
+        permutation_rng = streams.stream('real_share').numpy() if streams is not None else np.random
+        real_permutated_index = permutation_rng.permutation(x_train.shape[0])
         shortened_index = real_permutated_index[:number_real_samples]
     
         x_train = x_train.take(shortened_index, axis=0)
@@ -39,49 +74,85 @@ def enhance_data(
     
     if include_synthetic:
         
-        if real_share < 1 or force_generator:
+        if new_generator:
             print()
-            print(f'fitting new {"wasserstein" if wasserstein else ""} generator on smaller data')
+            print(f'fitting new {"wasserstein" if wasserstein else ""} generator on {dataset} data')
             if wasserstein:
                 generator = train_wasserstein_generator(
                     training_data=np.column_stack((x_train, y_train)),
                     generate_img=True,
                     export_generator=False,
-                    n_epochs=generator_epochs)
+                    n_epochs=generator_epochs,
+                    streams=streams.stream('generator') if streams is not None else None)
+                critic = generator['discriminator']
                 generator = generator['generator']
             else:
                 generator = train_generator(
                     training_data=np.column_stack((x_train, y_train)),
                     generate_img=True,
                     export_generator=False,
-                    n_epochs=generator_epochs)
+                    n_epochs=generator_epochs,
+                    streams=streams.stream('generator') if streams is not None else None)
+                critic = generator['discriminator']
                 generator = generator['generator']
 
         else:
             print()
             print(f'loading pre-trained {"wasserstein" if wasserstein else "dcgan"} generator')
-            generator = tf.keras.models.load_model(f'../models/best_{"wasserstein_" if wasserstein else ""}generator.h5', compile=False)
+            # loaded and traced once per process, later calls get the same warm model
+            generator = registry.get(f'best_{"wasserstein_" if wasserstein else ""}generator.h5')
     
         number_samples = x_train.shape[0] * synthetic_share
         number_samples = int(number_samples)
-        synthetic_data = generate_data(model=generator, 
-                                       number_samples=number_samples)
+        
+        if critic_keep_share is not None:
+            # only the critic_keep_share best scored samples are kept - a smaller set of more realistic samples
+            synthetic_data = filter_generated(
+                generator,
+                critic,
+                number_samples=number_samples,
+                top_k=max(int(number_samples * critic_keep_share), 1),
+                seed=synthetic_seed)
+            print(f'critic filter kept {synthetic_data["y_train"].shape[0]} of {number_samples} synthetic samples')
+        
+        elif cache_synthetic:
+            # same generator weights, seed and sample count - the samples of an earlier run are reused from disk
+            synthetic_data = synthetic_cache.get_or_generate(
+                generator,
+                seed=synthetic_seed,
+                number_samples=number_samples,
+                number_workers=synthetic_workers)
+        else:
+            synthetic_data = generate_data(model=generator, 
+                                           number_samples=number_samples,
+                                           seed=synthetic_seed,
+                                           number_workers=synthetic_workers)
         
         if replace_real_data:
             x_train = synthetic_data['x_train']
             y_train = synthetic_data['y_train']
             
         else:
-            # stack data together
-            x_train = np.vstack((x_train, synthetic_data['x_train']))
-            y_train = np.concatenate((y_train, synthetic_data['y_train']))
-            
             # create random index permutation to shuffle both arrays randomly, but preserve label match
-            permutation_index = np.random.permutation(x_train.shape[0])
+            number_real = x_train.shape[0]
+            number_total = number_real + synthetic_data['x_train'].shape[0]
+            shuffle_rng = streams.stream('shuffle').numpy() if streams is not None else np.random
+            permutation_index = shuffle_rng.permutation(number_total)
+            
+            # stack and shuffle in one pass - every row is written straight to its shuffled position,
+            # the same arrays as stacking and then taking along the permutation, without the stacked copy
+            position = np.empty_like(permutation_index)
+            position[permutation_index] = np.arange(number_total)
+            
+            stacked_x = np.empty((number_total, x_train.shape[1]), dtype=x_train.dtype)
+            stacked_x[position[:number_real]] = x_train
+            stacked_x[position[number_real:]] = synthetic_data['x_train']
+            
+            stacked_y = np.empty(number_total, dtype=np.result_type(y_train, synthetic_data['y_train']))
+            stacked_y[position[:number_real]] = y_train
+            stacked_y[position[number_real:]] = synthetic_data['y_train']
             
-            # overwrite with shuffled arrays along the index
-            x_train = x_train.take(permutation_index, axis=0)
-            y_train = y_train.take(permutation_index, axis=0)
+            x_train, y_train = stacked_x, stacked_y
     
     else:
         pass
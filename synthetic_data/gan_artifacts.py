@@ -0,0 +1,116 @@
+import traceback
+import numpy as np
+import tensorflow as tf
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+
+
+# single background worker, created on first use - artifacts are written in submission order
+_executor = None
+
+
+def _report_failure(future: Future):
+    # exceptions stay in the future, print them so a failed plot or export is never silent
+    if future.exception() is not None:
+        traceback.print_exception(type(future.exception()), future.exception(), future.exception().__traceback__)
+
+
+def submit_artifact(function, *args, **kwargs) -> Future:
+    """
+    runs function(*args, **kwargs) on the background artifact worker, returns its future
+
+    the worker thread is joined when the interpreter exits, so pending artifacts are still written
+    after the training function returned
+    """
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='gan_artifacts')
+
+    future = _executor.submit(function, *args, **kwargs)
+    future.add_done_callback(_report_failure)
+
+    return future
+
+
+def wait_for_artifacts(futures: list = None):
+    # blocks until the given artifacts are written and re-raises their failures - without futures it waits
+    # for everything submitted so far (the single worker runs in order)
+    if futures is None:
+        futures = []
+        if _executor is not None:
+            futures.append(_executor.submit(lambda: None))
+
+    wait(futures)
+    for future in futures:
+        future.result()
+
+
+def plot_training_log(
+    all_losses: np.ndarray,
+    all_d_vals: np.ndarray,
+    path: str,
+    d_loss_scale: float = 1.0,
+    loss_alpha: float = 0.75,
+    epoch_tick_step: int = None,
+    discriminator_label: str = 'Discriminator output') -> str:
+    """
+    two panel training log - losses and discriminator outputs per iteration, with a second epoch axis
+
+    takes the compact (epochs, steps, values) arrays of the trainers, the per step series are plain column slices -
+    matplotlib is imported here, on the worker, and only the object oriented Agg api is used (pyplot keeps global
+    state that is not thread safe, and needs a display backend)
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    number_epochs, steps_per_epoch = all_losses.shape[:2]
+    epoch_tick_step = epoch_tick_step or max(number_epochs // 10, 1)
+    epoch_ticks = np.arange(0, number_epochs, epoch_tick_step)
+    tick_positions = epoch_ticks * steps_per_epoch
+
+    fig = Figure(figsize=(20, 10))
+    FigureCanvasAgg(fig)
+
+    panels = [
+        (
+            [(all_losses[:, :, 0].ravel(), 'Generator loss'),
+             (all_losses[:, :, 1].ravel() * d_loss_scale, 'Discriminator loss')],
+            'Loss', loss_alpha),
+        (
+            [(all_d_vals[:, :, 0].ravel(), r'Real: $D(\mathbf{x})$'),
+             (all_d_vals[:, :, 1].ravel(), r'Fake: $D(G(\mathbf{z}))$')],
+            discriminator_label, 0.75)]
+
+    for i, (series, ylabel, alpha) in enumerate(panels):
+        ax = fig.add_subplot(1, 2, i + 1)
+        for values, label in series:
+            ax.plot(values, label=label, alpha=alpha)
+        ax.legend(fontsize=20)
+        ax.set_xlabel('Iteration', size=15)
+        ax.set_ylabel(ylabel, size=15)
+
+        ax2 = ax.twiny()
+        ax2.set_xticks(tick_positions)
+        ax2.set_xticklabels(epoch_ticks)
+        ax2.xaxis.set_ticks_position('bottom')
+        ax2.xaxis.set_label_position('bottom')
+        ax2.spines['bottom'].set_position(('outward', 60))
+        ax2.set_xlabel('Epoch', size=15)
+        ax2.set_xlim(ax.get_xlim())
+        ax.tick_params(axis='both', which='major', labelsize=15)
+        ax2.tick_params(axis='both', which='major', labelsize=15)
+
+    fig.savefig(path)
+    print(f'image saved to: {path}')
+
+    return path
+
+
+def export_model(
+    model: tf.keras.Model,
+    path: str) -> str:
+    # the training loop is done when this is submitted - the worker only reads the weights
+    tf.keras.models.save_model(model, path)
+    print(f'generator model saved to: {path}')
+
+    return path
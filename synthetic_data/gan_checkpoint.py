@@ -0,0 +1,92 @@
+import io
+import numpy as np
+import tensorflow as tf
+from gan_metrics import LossAccumulator
+
+
+class LossHistoryState(tf.train.experimental.PythonState):
+    """
+    makes the host side loss history of a LossAccumulator part of a tf.train.Checkpoint
+    """
+
+    def __init__(self, metrics: LossAccumulator):
+        self.metrics = metrics
+
+    def serialize(self) -> bytes:
+        # only steps already copied to the host are saved - flush before saving
+        buffer = io.BytesIO()
+        np.save(buffer, self.metrics.values[:self.metrics.number_steps])
+
+        return buffer.getvalue()
+
+    def deserialize(self, string_value: bytes):
+        values = np.load(io.BytesIO(string_value))
+
+        self.metrics.values[:values.shape[0]] = values
+        self.metrics.number_steps = values.shape[0]
+
+
+def random_states(model: tf.keras.Model) -> list:
+    # rng state variables of seeded keras layers (dropout) - keras keeps them with the model variables,
+    # but a tf.train.Checkpoint of the model doesn't reach them
+    return [
+        variable for variable in model.non_trainable_variables
+        if 'seed_generator' in getattr(variable, 'path', variable.name)]
+
+
+class TrainingCheckpoint:
+    """
+    periodic checkpoints of a gan training run - models, optimizer state, rng streams, the loss history
+    and the last finished epoch - with the last keep_last checkpoints retained in directory
+
+    checkpoints are written at epoch boundaries, restore() puts everything back so a resumed run continues with
+    exactly the same batches, noise, dropout masks and updates as an uninterrupted one - the dropout masks only
+    where keras keeps the dropout rng state in a variable (keras 3 seed generators), keras 2 dropout draws
+    from stateful ops that aren't saved
+
+    exact resume holds for single process runs only - distributed input pipelines draw from generators split off
+    the saved rng and prefetch ahead of the epoch boundary, a restored distributed run (exact_resume=False) gets the
+    models, optimizers and loss history back, but a different data order and noise than an uninterrupted one
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        metrics: LossAccumulator,
+        keep_last: int = 3,
+        exact_resume: bool = True,
+        **trackables):
+
+        self.metrics = metrics
+        self.exact_resume = exact_resume
+        self.epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+
+        # optional parts of the training state (e.g. early stopping) are passed as None when unused
+        trackables = {name: trackable for name, trackable in trackables.items() if trackable is not None}
+        models = {name: trackable for name, trackable in trackables.items() if isinstance(trackable, tf.keras.Model)}
+
+        self.checkpoint = tf.train.Checkpoint(
+            epoch=self.epoch,
+            loss_history=LossHistoryState(metrics),
+            **trackables,
+            **{f'{name}_random_states': random_states(model) for name, model in models.items()})
+        self.manager = tf.train.CheckpointManager(
+            self.checkpoint, directory=directory, max_to_keep=keep_last)
+
+    def restore(self) -> int:
+        # returns the last finished epoch of the restored run, 0 if there is nothing to resume
+        if self.manager.latest_checkpoint is None:
+            return 0
+
+        self.checkpoint.restore(self.manager.latest_checkpoint)
+        print(f'resuming from checkpoint {self.manager.latest_checkpoint} - epoch {int(self.epoch.numpy())}')
+        if not self.exact_resume:
+            print('distributed run - data order and noise after the resume differ from an uninterrupted run')
+
+        return int(self.epoch.numpy())
+
+    def save(self, epoch: int) -> str:
+        self.metrics.flush()
+        self.epoch.assign(epoch)
+
+        return self.manager.save(checkpoint_number=epoch)
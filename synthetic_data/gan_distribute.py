@@ -0,0 +1,134 @@
+import os
+import json
+import socket
+import multiprocessing
+import tensorflow as tf
+
+
+# collective ops are configured once per process - every trainer call in a worker shares one strategy
+_multi_worker_strategy = None
+
+
+def make_strategy(
+    distribute: str = 'mirrored',
+    number_replicas: int = None) -> tf.distribute.Strategy:
+    """
+    data parallel strategy for the gan trainers
+
+    'mirrored' - one replica per logical cpu device, the physical cpu is split into number_replicas logical devices
+    (defaults to one per core) - this only works before tensorflow initialized its devices, so the strategy has to be
+    built before any tensorflow variable, rng or op - raises if fewer than number_replicas logical cpus exist
+    'multi_worker' - MultiWorkerMirroredStrategy, the cluster is read from the TF_CONFIG environment variable,
+    see run_local_workers for a local multi process stand in - built once per process, also before any tensorflow state
+    """
+
+    global _multi_worker_strategy
+
+    assert distribute in ('mirrored', 'multi_worker'), f'distribute needs to be mirrored or multi_worker - got {distribute}'
+
+    if distribute == 'multi_worker':
+        if _multi_worker_strategy is None:
+            _multi_worker_strategy = tf.distribute.MultiWorkerMirroredStrategy()
+
+        return _multi_worker_strategy
+
+    number_replicas = number_replicas or os.cpu_count()
+    cpus = tf.config.list_physical_devices('CPU')
+
+    try:
+        tf.config.set_logical_device_configuration(
+            cpus[0], [tf.config.LogicalDeviceConfiguration()] * number_replicas)
+    except RuntimeError:
+        # devices are already initialized - enough if an earlier call split the cpu
+        pass
+
+    devices = [device.name for device in tf.config.list_logical_devices('CPU')][:number_replicas]
+
+    if len(devices) < number_replicas:
+        raise RuntimeError(
+            f'{number_replicas} replicas need {number_replicas} logical cpus, tensorflow was already initialized '
+            f'with {len(devices)} - build the strategy before any tensorflow variable, rng or op in this process')
+
+    return tf.distribute.MirroredStrategy(devices=devices)
+
+
+def is_chief(strategy: tf.distribute.Strategy = None) -> bool:
+    # only the chief writes images, models and checkpoints
+    if strategy is None or strategy.cluster_resolver is None:
+        return True
+
+    return strategy.cluster_resolver.task_id == 0
+
+
+def build_optimizer(
+    optimizer: tf.keras.optimizers.Optimizer,
+    variables: list):
+    # creates the optimizer slots up front in the strategy scope - keras optimizers that create them lazily
+    # on the first apply_gradients break the distributed train step when that happens inside a replica
+    if hasattr(optimizer, 'build'):
+        optimizer.build(variables)
+    else:
+        optimizer._create_all_weights(variables)
+
+
+def distribute_train_steps(
+    strategy: tf.distribute.Strategy,
+    train_steps):
+    """
+    runs the train function on every replica and sums the step values -
+    the replicas scale their losses by 1 / replicas, so the sum is the mean over the global batch
+    """
+
+    @tf.function
+    def distributed_train_steps(input_z, input_real):
+        per_replica_values = strategy.run(train_steps, args=(input_z, input_real))
+
+        return strategy.reduce(tf.distribute.ReduceOp.SUM, per_replica_values, axis=None)
+
+    return distributed_train_steps
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+
+        return s.getsockname()[1]
+
+
+def local_cluster_spec(number_workers: int = 2) -> dict:
+    return {'worker': [f'localhost:{_free_port()}' for _ in range(number_workers)]}
+
+
+def _run_worker(tf_config: str, function, kwargs: dict):
+    # TF_CONFIG has to be set before tensorflow builds the strategy in this process, and the strategy has to exist
+    # before function creates any tensorflow state - collective ops can only be configured at program startup
+    os.environ['TF_CONFIG'] = tf_config
+    make_strategy('multi_worker')
+    function(**kwargs)
+
+
+def run_local_workers(
+    function,
+    number_workers: int = 2,
+    **kwargs):
+    """
+    stand in for a multi machine cluster - starts number_workers processes on localhost, each with its own TF_CONFIG,
+    and calls function(**kwargs) in all of them, e.g. run_local_workers(train_generator, training_data=x, distribute='multi_worker')
+
+    function has to be importable (module level), results are not returned - the chief (worker 0) exports
+    """
+
+    cluster = local_cluster_spec(number_workers)
+    context = multiprocessing.get_context('spawn')
+
+    workers = []
+    for task_index in range(number_workers):
+        tf_config = json.dumps({'cluster': cluster, 'task': {'type': 'worker', 'index': task_index}})
+        worker = context.Process(target=_run_worker, args=(tf_config, function, kwargs))
+        worker.start()
+        workers.append(worker)
+
+    for worker in workers:
+        worker.join()
+
+    return [worker.exitcode for worker in workers]
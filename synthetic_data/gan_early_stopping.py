@@ -0,0 +1,152 @@
+import io
+import numpy as np
+import tensorflow as tf
+from gan_pipeline import sample_latent
+
+
+def column_wasserstein(
+    real: np.ndarray,
+    fake: np.ndarray) -> np.ndarray:
+    """
+    per column 1d wasserstein (earth mover) distance between two samples of equal size
+
+    for equally sized samples the optimal transport pairs the sorted values, so the distance is the
+    mean absolute difference of the sorted columns - all columns are sorted in one vectorized call
+    """
+
+    assert real.shape == fake.shape, f'samples need the same shape - got {real.shape} and {fake.shape}'
+
+    return np.mean(np.abs(np.sort(real, axis=0) - np.sort(fake, axis=0)), axis=0)
+
+
+class ScoreHistoryState(tf.train.experimental.PythonState):
+    """
+    the (epoch, score) list of the fidelity checks as part of a tf.train.Checkpoint, like LossHistoryState
+    """
+
+    def __init__(self):
+        self.scores = []
+
+    def serialize(self) -> bytes:
+        buffer = io.BytesIO()
+        np.save(buffer, np.array(self.scores, dtype=np.float64).reshape(-1, 2))
+
+        return buffer.getvalue()
+
+    def deserialize(self, string_value: bytes):
+        self.scores = [(int(epoch), float(score)) for epoch, score in np.load(io.BytesIO(string_value))]
+
+
+class FidelityEarlyStopping(tf.Module):
+    """
+    early stopping for the gan trainers on a cheap fidelity signal
+
+    every check_every epochs the generator output for a fixed latent batch is compared to a held out slice of real rows -
+    the score is the mean per column wasserstein distance (lower is better) - training stops once the score did not
+    improve by more than min_delta for patience checks in a row, and restore() puts back the best generator weights
+
+    the held out rows, the latent batch and the weights only depend on the seed and the model, so all workers of a
+    distributed run reach the same decision - state and best weights are variables and the score history
+    a python state, so this is checkpointable and a resumed run keeps all checks of the run before
+    """
+
+    def __init__(
+        self,
+        generator_model: tf.keras.Model,
+        held_out: np.ndarray,
+        latent_space_shape: int = 8,
+        latent_space_mode: str = 'normal',
+        check_every: int = 5,
+        patience: int = 3,
+        min_delta: float = 1e-3,
+        number_samples: int = 2000,
+        seed: int = 42,
+        conditional: bool = False):
+
+        super().__init__()
+
+        # sub sample the held out slice once, the generated batch has the same size
+        random_state = np.random.RandomState(seed)
+        number_samples = min(number_samples, held_out.shape[0])
+        self.held_out = held_out[random_state.choice(held_out.shape[0], number_samples, replace=False)].astype(np.float32)
+
+        self.input_z = sample_latent(
+            tf.random.Generator.from_seed(seed),
+            shape=(number_samples, latent_space_shape),
+            mode=latent_space_mode)
+
+        if conditional:
+            # generate for the labels of the held out rows, so both samples have the same class balance
+            self.input_z = tf.concat([self.input_z, self.held_out[:, -1:]], axis=1)
+
+        self.generator_model = generator_model
+        self.check_every = check_every
+        self.patience = patience
+        self.min_delta = min_delta
+
+        self.best_score = tf.Variable(np.inf, dtype=tf.float32, trainable=False)
+        self.best_epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self.wait = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self.stopped = tf.Variable(False, trainable=False)
+        self.best_weights = [tf.Variable(weight, trainable=False) for weight in generator_model.weights]
+
+        self.score_history = ScoreHistoryState()
+
+    @property
+    def scores(self) -> list:
+        return self.score_history.scores
+
+    def score(self) -> float:
+        fake = self.generator_model(self.input_z, training=False).numpy()
+
+        return float(np.mean(column_wasserstein(self.held_out, fake)))
+
+    def update(self, epoch: int) -> bool:
+        # returns True once training should stop, only scores on check epochs
+        if epoch % self.check_every != 0:
+            return bool(self.stopped.numpy())
+
+        score = self.score()
+        self.scores.append((epoch, score))
+
+        if score < float(self.best_score.numpy()) - self.min_delta:
+            self.best_score.assign(score)
+            self.best_epoch.assign(epoch)
+            self.wait.assign(0)
+
+            for best_weight, weight in zip(self.best_weights, self.generator_model.weights):
+                best_weight.assign(weight)
+
+        else:
+            self.wait.assign_add(1)
+
+        print(
+            f'fidelity check | epoch {epoch} | column wasserstein {score:.4f} | '
+            f'best {float(self.best_score.numpy()):.4f} (epoch {int(self.best_epoch.numpy())})')
+
+        if self.wait.numpy() >= self.patience:
+            self.stopped.assign(True)
+            print(f'early stopping - no improvement in the last {self.patience} checks')
+
+        return bool(self.stopped.numpy())
+
+    def restore(self):
+        # nothing to restore before the first check
+        if int(self.best_epoch.numpy()) == 0:
+            return
+
+        for best_weight, weight in zip(self.best_weights, self.generator_model.weights):
+            weight.assign(best_weight)
+
+        print(f'restored generator weights from epoch {int(self.best_epoch.numpy())}')
+
+
+def split_held_out(
+    training_data: np.ndarray,
+    validation_split: float = 0.1,
+    seed: int = 42) -> tuple:
+    # random held out rows for the fidelity checks, they are not trained on - returns (training rows, held out rows)
+    permutation = np.random.RandomState(seed).permutation(training_data.shape[0])
+    number_held_out = int(training_data.shape[0] * validation_split)
+
+    return training_data[permutation[number_held_out:]], training_data[permutation[:number_held_out]]
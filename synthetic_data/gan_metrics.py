@@ -0,0 +1,92 @@
+import numpy as np
+import tensorflow as tf
+
+
+# order of the values every train step returns
+STEP_VALUES = ('g_loss', 'd_loss', 'd_loss_real', 'd_loss_fake', 'd_probs_real', 'd_probs_fake')
+
+
+class LossAccumulator:
+    """
+    collects the per step losses and discriminator outputs of the gan training loops on device
+
+    step values are written into a fixed size variable buffer and only copied to the host every flush_every steps,
+    into a numpy array preallocated for the whole run - the running epoch sums also stay on device
+    until the epoch summary is requested
+    """
+
+    def __init__(
+        self,
+        n_epochs: int,
+        steps_per_epoch: int,
+        flush_every: int = 256,
+        number_values: int = len(STEP_VALUES)):
+
+        self.steps_per_epoch = steps_per_epoch
+        self.flush_every = flush_every
+        self.values = np.zeros((n_epochs * steps_per_epoch, number_values), dtype=np.float32)
+        self.number_steps = 0
+        self.steps_in_buffer = 0
+
+        self.buffer = tf.Variable(tf.zeros((flush_every, number_values)), trainable=False)
+        self.position = tf.Variable(0, trainable=False)
+        self.epoch_sum = tf.Variable(tf.zeros((number_values,)), trainable=False)
+        self.epoch_count = tf.Variable(0., trainable=False)
+
+        self._write = tf.function(
+            self._write_values,
+            input_signature=[tf.TensorSpec(shape=(None, number_values), dtype=tf.float32)])
+
+    def _write_values(self, step_values):
+        number_steps = tf.shape(step_values)[0]
+        self.buffer[self.position:self.position + number_steps].assign(step_values)
+        self.position.assign_add(number_steps)
+        self.epoch_sum.assign_add(tf.reduce_sum(step_values, axis=0))
+        self.epoch_count.assign_add(tf.cast(number_steps, tf.float32))
+
+    def update(self, step_values: tf.Tensor):
+        # the number of steps is known from the static shape, no host sync needed
+        number_steps = step_values.shape[0]
+        assert number_steps <= self.flush_every, f'cannot buffer {number_steps} steps, flush_every is {self.flush_every}'
+
+        if self.steps_in_buffer + number_steps > self.flush_every:
+            self.flush()
+
+        self._write(step_values)
+        self.steps_in_buffer += number_steps
+
+        if self.steps_in_buffer == self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self.steps_in_buffer == 0:
+            return
+
+        # single device -> host copy for all buffered steps
+        end = self.number_steps + self.steps_in_buffer
+        self.values[self.number_steps:end] = self.buffer[:self.steps_in_buffer].numpy()
+        self.number_steps = end
+        self.steps_in_buffer = 0
+        self.position.assign(0)
+
+    def epoch_means(self) -> np.ndarray:
+        # one sync per epoch, resets the running sums for the next epoch
+        means = (self.epoch_sum / tf.maximum(self.epoch_count, 1.)).numpy()
+        self.epoch_sum.assign(tf.zeros_like(self.epoch_sum))
+        self.epoch_count.assign(0.)
+
+        return means
+
+    def result(self) -> dict:
+        self.flush()
+
+        # complete epochs only, shaped (epochs, steps, values)
+        number_epochs = self.number_steps // self.steps_per_epoch
+        values = self.values[:number_epochs * self.steps_per_epoch]
+        values = values.reshape(number_epochs, self.steps_per_epoch, -1)
+
+        result = {
+            'all_losses': values[:, :, :4],
+            'all_d_vals': values[:, :, 4:]}
+
+        return result
@@ -0,0 +1,91 @@
+import numpy as np
+import tensorflow as tf
+
+
+AUTOTUNE = tf.data.experimental.AUTOTUNE
+
+
+def sample_latent(
+    rng: tf.random.Generator,
+    shape: tuple,
+    mode: str = 'normal') -> tf.Tensor:
+
+    if mode == 'uniform':
+        return rng.uniform(shape=shape, minval=-1.0, maxval=1.0)
+
+    return rng.normal(shape=shape)
+
+
+def make_training_dataset(
+    training_data: np.ndarray,
+    rng: tf.random.Generator,
+    latent_space_shape: int = 8,
+    latent_space_mode: str = 'normal',
+    batch_size: int = 32,
+    steps_per_execution: int = 1,
+    deterministic: bool = True,
+    repeat: bool = False,
+    input_context: tf.distribute.InputContext = None,
+    conditional: bool = False) -> tf.data.Dataset:
+    """
+    input pipeline for the gan trainers, yields (input_z, input_real) batches
+
+    the real data is converted to float32 once and held as a single in memory tensor - every pass over the data
+    gathers it in a fresh random order and splits it into full batches, then the latent noise is drawn for a whole
+    batch in one vectorized call - batches are stacked into chunks of (steps, batch, features) for the train functions
+
+    the order and the noise both come from the stateful rng, in a fixed sequence - runs are reproducible for a fixed seed,
+    and without repeat a pass draws nothing from the rng after it ends, so the rng state at an epoch boundary fully
+    determines all following epochs (which is what makes checkpointed training resume exactly) - with repeat=True
+    the prefetch already draws into the next pass, and with an input_context the draws come from generators split
+    off rng, which its state doesn't cover - neither resumes exactly from a saved rng
+    deterministic=False lets the noise map run in parallel, which gives up the fixed draw order
+
+    conditional=True appends the label of every real row (its last column) to its latent code - the generator
+    produces a sample for that label, see gan_training.conditional_generator
+
+    with an input_context (tf.distribute), batch_size is the per replica batch - rows are sharded per input pipeline
+    and every pipeline draws from its own split of the rng
+    """
+
+    assert latent_space_mode in ('uniform', 'normal'), f'latent space mode needs to be uniform or normal - got {latent_space_mode}'
+    assert len(training_data.shape) == 2, f'training data needs to be 2D (samples, features) - shape is {training_data.shape}'
+
+    real_data = tf.convert_to_tensor(training_data, dtype=tf.float32)
+
+    if input_context is not None:
+        real_data = real_data[input_context.input_pipeline_id::input_context.num_input_pipelines]
+        rng = rng.split(input_context.num_input_pipelines)[input_context.input_pipeline_id]
+
+    number_rows, number_features = real_data.shape
+    number_batches = number_rows // batch_size
+
+    def shuffled_batches(rows):
+        # full permutation per pass, the remainder rows of this pass are dropped
+        permutation = tf.argsort(rng.uniform(shape=(number_rows,)))
+        rows = tf.gather(rows, permutation[:number_batches * batch_size])
+
+        return tf.reshape(rows, (number_batches, batch_size, number_features))
+
+    dataset = tf.data.Dataset.from_tensors(real_data)
+
+    if repeat:
+        dataset = dataset.repeat()
+
+    dataset = dataset.map(shuffled_batches).unbatch()
+
+    def with_noise(real):
+        input_z = sample_latent(rng, shape=(batch_size, latent_space_shape), mode=latent_space_mode)
+
+        if conditional:
+            input_z = tf.concat([input_z, real[:, -1:]], axis=1)
+
+        return input_z, real
+
+    dataset = dataset.map(with_noise, num_parallel_calls=None if deterministic else AUTOTUNE)
+
+    # leading steps axis, even for a single step, so the train functions always see chunks -
+    # a repeated stream only has full chunks, which gives them a static number of steps
+    dataset = dataset.batch(steps_per_execution, drop_remainder=repeat)
+
+    return dataset.prefetch(AUTOTUNE)
@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import contextlib
+import numpy as np
+import tensorflow as tf
+from gan_metrics import STEP_VALUES
+from gan_artifacts import submit_artifact, wait_for_artifacts
+from run_logs import logdir
+
+
+# order of the timing values a timed train step appends to its step values
+TIMING_VALUES = ('forward_backward_seconds', 'optimizer_seconds')
+
+
+def timestamp(*dependencies) -> tf.Tensor:
+    # wall clock inside the graph, taken once all dependencies are computed
+    with tf.control_dependencies([tf.identity(tensor) for tensor in tf.nest.flatten(dependencies)]):
+        return tf.timestamp()
+
+
+class PhaseTimer:
+    """
+    in graph split of a train step into forward / backward and optimizer time, in seconds
+
+    every phase is built in a `with timer.phase():` block and closed by a mark - forward_backward(grads) after the
+    gradients, optimizer(variables) after an update, on reads of the updated variables
+    the graph executor runs an op as soon as its inputs are ready, so a timestamp only waiting on a phase's results can
+    still run before the phase's work - the phase block makes its ops wait for the previous mark
+    a disabled timer adds no ops, the step values are then returned unchanged
+    """
+
+    def __init__(self, enabled: bool = False, number_replicas: int = 1):
+        self.enabled = enabled
+        self.number_replicas = number_replicas
+
+        if enabled:
+            self.last = tf.timestamp()
+            self.seconds = {name: tf.constant(0., dtype=tf.float64) for name in TIMING_VALUES}
+
+    def phase(self):
+        # ops created in the block start after the last mark
+        if not self.enabled:
+            return contextlib.nullcontext()
+
+        return tf.control_dependencies([self.last])
+
+    def _mark(self, name: str, *dependencies):
+        if not self.enabled:
+            return
+
+        now = timestamp(*dependencies)
+        self.seconds[name] += now - self.last
+        self.last = now
+
+    def forward_backward(self, *grads):
+        self._mark('forward_backward_seconds', *grads)
+
+    def optimizer(self, *variables):
+        # automatic control dependencies order the reads after the update's assign ops
+        self._mark('optimizer_seconds', *variables)
+
+    def append_to(self, step_values: tf.Tensor) -> tf.Tensor:
+        if not self.enabled:
+            return step_values
+
+        # scaled like the losses, the sum over the replicas is the mean
+        timings = tf.cast(tf.stack([self.seconds[name] for name in TIMING_VALUES]), tf.float32)
+
+        return tf.concat([step_values, timings / self.number_replicas], axis=0)
+
+
+class StepTelemetry:
+    """
+    sampled step level telemetry for the gan training loops
+
+    per chunk the host only times how long the input pipeline took to hand over the next chunk - every sample_every
+    steps it syncs with the device once and records wall time per step, samples per second, the input share of
+    the wall time and the in graph forward / backward and optimizer time of the last chunk
+    records go to tf.summary scalars in log_dir (tensorboard) and as one json object per line to log_dir/telemetry.jsonl -
+    both are written on the background artifact worker, the training loop only builds the record
+
+    the first sample only sets the clock, so tracing and warm up are not counted - the host time spent sampling is
+    reported as sampling_fraction, the in graph marks every timed step pays (timestamps and their control
+    dependencies) are not in it
+    """
+
+    def __init__(
+        self,
+        log_dir: str = None,
+        sample_every: int = 100,
+        samples_per_step: int = 32,
+        write: bool = True):
+
+        if log_dir is None:
+            # same run directory layout as the tensorboard logs of the classifier grid search
+            log_dir = logdir('gan_telemetry')
+
+        self.log_dir = log_dir
+        self.sample_every = sample_every
+        self.samples_per_step = samples_per_step
+        self.write = write
+
+        self.step = 0
+        self.steps_since_sample = 0
+        self.input_seconds = 0.
+        self.sampling_seconds = 0.
+        self.last_sample_time = None
+        self.records = []
+
+        if write:
+            os.makedirs(log_dir, exist_ok=True)
+            self.summary_writer = tf.summary.create_file_writer(log_dir)
+            self.jsonl_file = open(os.path.join(log_dir, 'telemetry.jsonl'), 'a')
+
+    def timed_input(self, chunks):
+        # yields the chunks of an epoch, adding up the time spent waiting for each of them
+        iterator = iter(chunks)
+
+        while True:
+            start_time = time.perf_counter()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            self.input_seconds += time.perf_counter() - start_time
+
+            yield chunk
+
+    def update(self, step_values: tf.Tensor) -> tf.Tensor:
+        # takes the values of a timed train step, returns the loss columns for the loss accumulator
+        number_steps = step_values.shape[0]
+        self.step += number_steps
+        self.steps_since_sample += number_steps
+
+        if self.steps_since_sample >= self.sample_every or self.last_sample_time is None:
+            self._sample(step_values[:, len(STEP_VALUES):])
+
+        return step_values[:, :len(STEP_VALUES)]
+
+    def _sample(self, timings: tf.Tensor):
+        # the only device sync - waits for the last chunk and everything queued before it
+        timings = timings.numpy()
+        now = time.perf_counter()
+
+        if self.last_sample_time is not None:
+            wall_seconds = now - self.last_sample_time
+            record = {
+                'step': self.step,
+                'step_seconds': wall_seconds / self.steps_since_sample,
+                'samples_per_second': self.steps_since_sample * self.samples_per_step / wall_seconds,
+                'input_fraction': self.input_seconds / wall_seconds,
+                'sampling_fraction': self.sampling_seconds / wall_seconds}
+            record.update(zip(TIMING_VALUES, np.mean(timings, axis=0).tolist()))
+            self.records.append(record)
+
+            if self.write:
+                submit_artifact(self._write_record, record)
+
+        self.steps_since_sample = 0
+        self.input_seconds = 0.
+        self.sampling_seconds = time.perf_counter() - now
+        self.last_sample_time = now
+
+    def _write_record(self, record: dict):
+        with self.summary_writer.as_default():
+            for name, value in record.items():
+                if name != 'step':
+                    tf.summary.scalar(f'telemetry/{name}', value, step=record['step'])
+
+        self.jsonl_file.write(json.dumps(record) + '\n')
+
+    def _close_files(self):
+        self.summary_writer.flush()
+        self.jsonl_file.close()
+
+    def close(self):
+        # after the records still queued on the worker
+        if self.write:
+            wait_for_artifacts([submit_artifact(self._close_files)])
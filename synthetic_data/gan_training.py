@@ -0,0 +1,50 @@
+import tensorflow as tf
+
+
+def fused_critic_call(
+    discriminator_model: tf.keras.Sequential,
+    input_real: tf.Tensor,
+    g_output: tf.Tensor,
+    training: bool = True) -> tuple:
+    """
+    runs real and generated samples through the discriminator in one concatenated pass, returns (real, fake) outputs
+
+    dense and activation layers see the combined batch, BatchNormalization layers are applied to the real and fake
+    halves separately - so batch statistics never mix real and generated samples, same as with two separate calls
+    """
+
+    batch_size = tf.shape(input_real)[0]
+    x = tf.concat([tf.cast(input_real, g_output.dtype), g_output], axis=0)
+
+    for layer in discriminator_model.layers:
+        if isinstance(layer, tf.keras.layers.BatchNormalization):
+            x = tf.concat([
+                layer(x[:batch_size], training=training),
+                layer(x[batch_size:], training=training)], axis=0)
+        else:
+            x = layer(x, training=training)
+
+    return x[:batch_size], x[batch_size:]
+
+
+def conditional_generator(network: tf.keras.Sequential) -> tf.keras.Model:
+    """
+    label conditioned generator around a built generator network - the last input column is the label,
+    the network sees it together with the latent code and the label is passed through as the last output column
+
+    generated rows are (features, label) like the real rows, so the critic gets the label concatenated to its input
+    and the train steps stay the same for conditional and unconditional training
+    """
+
+    number_inputs = network.input_shape[-1]
+    inputs = tf.keras.Input(shape=(number_inputs,))
+
+    # picks the label column with a frozen one hot kernel - exact, and unlike a slice op it reloads from .h5 anywhere
+    label = tf.keras.layers.Dense(
+        1,
+        use_bias=False,
+        trainable=False,
+        kernel_initializer=tf.keras.initializers.Constant([[0.]] * (number_inputs - 1) + [[1.]]))(inputs)
+    outputs = tf.keras.layers.Concatenate()([network(inputs), label])
+
+    return tf.keras.Model(inputs, outputs)
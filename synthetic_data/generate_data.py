@@ -1,31 +1,274 @@
+import weakref
 import tensorflow as tf
 import numpy as np
+from dtype_policy import as_floatx, floatx, label_dtype
 
 
 tf.random.set_seed(42)
-noise_generator = tf.random.Generator.from_seed(42)
+
+# seeds of generate_data calls without one, created on first use - a generator created at import would initialize
+# the tensorflow runtime before a distribution strategy can be built
+_noise_generator = None
+
+# traced inference functions per model and block shape, shared by all callers of the same model instance
+_inference_functions = weakref.WeakKeyDictionary()
+
+
+def noise_generator() -> tf.random.Generator:
+    global _noise_generator
+
+    if _noise_generator is None:
+        _noise_generator = tf.random.Generator.from_seed(42)
+
+    return _noise_generator
+
+
+def latent_block(
+    seed: int,
+    block: int,
+    block_size: int = 1024,
+    latent_space_shape: int = 8,
+    latent_space_mode: str = 'normal') -> tf.Tensor:
+    # noise for rows [block * block_size, (block + 1) * block_size), a pure function of (seed, block)
+    shape = (block_size, latent_space_shape)
+    seed = tf.constant([seed, block], dtype=tf.int64)
+
+    if latent_space_mode == 'uniform':
+        return tf.random.stateless_uniform(shape, seed=seed, minval=-1.0, maxval=1.0)
+
+    return tf.random.stateless_normal(shape, seed=seed)
+
+
+def inference_function(
+    model: tf.keras.models.Model,
+    block_size: int = 1024,
+    latent_space_shape: int = 8):
+    # fixed signature, so every model and block shape is traced exactly once
+    functions = _inference_functions.setdefault(model, {})
+
+    if (block_size, latent_space_shape) not in functions:
+        # a strong reference from the cached function would keep the model alive forever
+        model_reference = weakref.ref(model)
+        functions[block_size, latent_space_shape] = tf.function(
+            lambda noise: model_reference()(noise, training=False),
+            input_signature=[tf.TensorSpec(shape=(block_size, latent_space_shape), dtype=tf.float32)])
+
+    return functions[block_size, latent_space_shape]
+
+
+def generate_block(
+    inference,
+    block: int,
+    seed: int = 42,
+    number_samples: int = 50,
+    block_size: int = 1024,
+    latent_space_shape: int = 8,
+    latent_space_mode: str = 'normal',
+    labels: np.ndarray = None) -> np.ndarray:
+    # generator output for rows [block * block_size, (block + 1) * block_size), cut to number_samples -
+    # labels are the ones of these rows, for conditional generators
+    noise = latent_block(seed, block, block_size, latent_space_shape, latent_space_mode)
+
+    if labels is not None:
+        # the last block is padded to the fixed block shape, the padding rows are cut below
+        block_labels = np.zeros((block_size, 1), dtype=np.float32)
+        block_labels[:len(labels), 0] = labels
+        noise = tf.concat([noise, block_labels], axis=1)
+
+    return inference(noise).numpy()[:number_samples - block * block_size]
+
+
+def split_samples(
+    data: np.ndarray,
+    conditional: bool = False) -> dict:
+    # generated rows to features and label - conditional generators pass the requested label through
+
+    result = {
+        'x_train': as_floatx(data[:, :-1]),
+        'y_train': (data[:, -1] if conditional else data[:, -1] >= 0).astype(label_dtype)}
+
+    return result
+
+
+def generate_batches(
+    model: tf.keras.models.Model,
+    latent_space_shape: int = 8,
+    number_samples: int = 50,
+    chunk_size: int = 4096,
+    seed: int = 42,
+    latent_space_mode: str = 'normal',
+    block_size: int = 1024,
+    labels: np.ndarray = None):
+    """
+    streams synthetic samples as {'x_train', 'y_train'} chunks of chunk_size rows (the last one can be shorter)
+
+    the generator always runs on fixed blocks of block_size rows, each with its own noise seed (seed, block index) -
+    so a row only depends on seed and its position, the output is identical for any chunk_size, and the inference
+    function is traced once per model - peak memory is one chunk plus one block, independent of number_samples
+
+    labels (one per sample) are for generators trained with conditional=True - the label of every row is appended
+    to its noise and returned as y_train, instead of thresholding the generated label column
+    """
+
+    assert latent_space_mode in ('uniform', 'normal'), f'latent space mode needs to be uniform or normal - got {latent_space_mode}'
+    assert labels is None or len(labels) == number_samples, f'need one label per sample - got {len(labels)} for {number_samples}'
+
+    conditional = labels is not None
+    inference = inference_function(model, block_size, latent_space_shape + int(conditional))
+
+    number_blocks = -(-number_samples // block_size)
+    pending = []
+    number_pending = 0
+
+    for block in range(number_blocks):
+        data = generate_block(
+            inference,
+            block,
+            seed,
+            number_samples,
+            block_size,
+            latent_space_shape,
+            latent_space_mode,
+            labels[block * block_size:(block + 1) * block_size] if conditional else None)
+
+        pending.append(data)
+        number_pending += data.shape[0]
+
+        while number_pending >= chunk_size or (block == number_blocks - 1 and number_pending > 0):
+            data = np.concatenate(pending) if len(pending) > 1 else pending[0]
+            chunk, rest = data[:chunk_size], data[chunk_size:]
+            pending = [rest] if rest.shape[0] else []
+            number_pending = rest.shape[0]
+
+            yield split_samples(chunk, conditional)
+
+
+def generate_to_npy(
+    model: tf.keras.models.Model,
+    x_path: str,
+    y_path: str,
+    latent_space_shape: int = 8,
+    number_samples: int = 50,
+    chunk_size: int = 4096,
+    seed: int = 42,
+    latent_space_mode: str = 'normal',
+    block_size: int = 1024,
+    labels: np.ndarray = None,
+    number_workers: int = 1) -> dict:
+    """
+    writes the generate_batches stream straight into preallocated .npy files, returns them as read only memmaps
+
+    nothing but the current chunk is held in memory, so number_samples is only bounded by disk -
+    number_workers > 1 fills the files from a process pool, see parallel_generate (same rows)
+    """
+
+    if number_workers > 1:
+        from parallel_generate import generate_parallel
+
+        return generate_parallel(
+            model,
+            x_path=x_path,
+            y_path=y_path,
+            latent_space_shape=latent_space_shape,
+            number_samples=number_samples,
+            seed=seed,
+            latent_space_mode=latent_space_mode,
+            block_size=block_size,
+            labels=labels,
+            number_workers=number_workers)
+
+    number_features = model.output_shape[-1]
+    x_train = np.lib.format.open_memmap(x_path, mode='w+', dtype=floatx(), shape=(number_samples, number_features - 1))
+    y_train = np.lib.format.open_memmap(y_path, mode='w+', dtype=label_dtype, shape=(number_samples,))
+
+    start = 0
+    for chunk in generate_batches(
+            model,
+            latent_space_shape=latent_space_shape,
+            number_samples=number_samples,
+            chunk_size=chunk_size,
+            seed=seed,
+            latent_space_mode=latent_space_mode,
+            block_size=block_size,
+            labels=labels):
+        end = start + chunk['y_train'].shape[0]
+        x_train[start:end] = chunk['x_train']
+        y_train[start:end] = chunk['y_train']
+        start = end
+
+    x_train.flush()
+    y_train.flush()
+    del x_train, y_train
+
+    result = {
+        'x_train': np.load(x_path, mmap_mode='r'),
+        'y_train': np.load(y_path, mmap_mode='r')}
+
+    return result
 
 
 def generate_data(
     model: tf.keras.models.Model,
     latent_space_shape: int = 8,
-    number_samples: int = 50) -> dict:
-    
-    noise = noise_generator.normal(shape=(number_samples, latent_space_shape))
-
-    data = model(noise, training=False)
-    x_train = data[:, :-1].numpy()
-    y_train = data[:, -1].numpy()
-    y_train = np.abs(np.where(y_train < 0, 0, 1))
-    
+    number_samples: int = 50,
+    seed: int = None,
+    latent_space_mode: str = 'normal',
+    class_counts: dict = None,
+    number_workers: int = 1) -> dict:
+    # class_counts ({label: number of samples}) needs a generator trained with conditional=True -
+    # exactly that many samples per class are generated in one pass, number_samples is ignored
+    # number_workers > 1 generates on a process pool into shared memory, the arrays are zero copy views of it
+
+    # without a seed every call draws a new one, so repeated calls give new samples
+    if seed is None:
+        seed = int(noise_generator().make_seeds(1)[0, 0])
+
+    labels = None
+    if class_counts is not None:
+        assert model.input_shape[-1] == latent_space_shape + 1, \
+            f'class_counts needs a generator trained with conditional=True - got one with {model.input_shape[-1]} inputs'
+        labels = np.repeat(
+            np.array(list(class_counts.keys()), dtype=np.float32),
+            list(class_counts.values()))
+        number_samples = len(labels)
+
+    if number_workers > 1:
+        from parallel_generate import generate_parallel
+
+        return generate_parallel(
+            model,
+            latent_space_shape=latent_space_shape,
+            number_samples=number_samples,
+            seed=seed,
+            latent_space_mode=latent_space_mode,
+            labels=labels,
+            number_workers=number_workers)
+
+    chunks = list(generate_batches(
+        model,
+        latent_space_shape=latent_space_shape,
+        number_samples=number_samples,
+        chunk_size=max(number_samples, 1),
+        seed=seed,
+        latent_space_mode=latent_space_mode,
+        labels=labels))
+
+    if not chunks:
+        # number_samples=0 yields no chunks - zero rows with the shape and dtypes of generated ones
+        result = {
+            'x_train': np.empty((0, model.output_shape[-1] - 1), dtype=floatx()),
+            'y_train': np.empty(0, dtype=label_dtype)}
+
+        return result
+
     result = {
-        'x_train': x_train,
-        'y_train': y_train}
+        'x_train': np.concatenate([chunk['x_train'] for chunk in chunks]),
+        'y_train': np.concatenate([chunk['y_train'] for chunk in chunks])}
 
     return result
 
 
 if __name__ == '__main__':
-    
+
     test_data = generate_data(number_samples=50)
     print(test_data)
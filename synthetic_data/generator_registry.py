@@ -0,0 +1,75 @@
+import os
+import threading
+import collections
+import tensorflow as tf
+from generate_data import inference_function, latent_block
+
+
+models_root = os.path.relpath('../models')
+
+
+class GeneratorRegistry:
+    """
+    in process registry of loaded generator models - every file in directory is loaded once and the same instance
+    is handed to all callers, until it is evicted or the file changes on disk
+
+    a loaded model is warmed up right away: the fixed signature inference function that generate_data uses is
+    traced with one block of noise, so the first real generate call runs the graph directly
+    the registry holds at most max_models models and max_bytes of weights, the least recently used go first
+    """
+
+    def __init__(
+        self,
+        directory: str = models_root,
+        max_models: int = 4,
+        max_bytes: int = 512 * 2 ** 20,
+        block_size: int = 1024):
+
+        self.directory = directory
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.block_size = block_size
+
+        # file name -> (modification time, weight bytes, model), in least recently used order
+        self.models = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, name: str) -> tf.keras.Model:
+        path = os.path.join(self.directory, name)
+        modified = os.path.getmtime(path)
+
+        with self.lock:
+            if name in self.models and self.models[name][0] == modified:
+                self.models.move_to_end(name)
+
+                return self.models[name][2]
+
+            model = tf.keras.models.load_model(path, compile=False)
+            self.warm_up(model)
+
+            weight_bytes = sum(weight.nbytes for weight in model.get_weights())
+            self.models[name] = (modified, weight_bytes, model)
+            self.models.move_to_end(name)
+            self.evict()
+
+            return model
+
+    def warm_up(self, model: tf.keras.Model):
+        latent_space_shape = model.input_shape[-1]
+        inference = inference_function(model, self.block_size, latent_space_shape)
+        inference(latent_block(0, 0, self.block_size, latent_space_shape))
+
+    def evict(self):
+        # the most recently used model always stays
+        while len(self.models) > 1 and (
+                len(self.models) > self.max_models
+                or sum(weight_bytes for _, weight_bytes, _ in self.models.values()) > self.max_bytes):
+            self.models.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.models.clear()
+
+
+# shared by enhance_data and the experiment scripts
+registry = GeneratorRegistry()
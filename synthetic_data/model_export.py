@@ -0,0 +1,129 @@
+import os
+import numpy as np
+import tensorflow as tf
+
+
+models_root = os.path.relpath('../models')
+
+# None is the plain float32 flatbuffer - dynamic quantizes the weights to int8, int8 also the activations
+tflite_quantizations = (None, 'float16', 'dynamic', 'int8')
+
+
+class GeneratorServing(tf.Module):
+    # inference only wrapper with a fixed serving signature - any batch size, latent_space_shape noise columns
+
+    def __init__(self, model: tf.keras.Model):
+        super().__init__()
+        self.model = model
+
+        latent_space_shape = model.input_shape[-1]
+        self.serve = tf.function(
+            self._serve,
+            input_signature=[tf.TensorSpec(shape=(None, latent_space_shape), dtype=tf.float32, name='noise')])
+
+    def _serve(self, noise):
+        return {'samples': self.model(noise, training=False)}
+
+
+def export_saved_model(
+    model: tf.keras.Model,
+    directory: str) -> str:
+
+    serving = GeneratorServing(model)
+    tf.saved_model.save(serving, directory, signatures={'serving_default': serving.serve})
+
+    return directory
+
+
+def export_tflite(
+    model: tf.keras.Model,
+    path: str,
+    quantization: str = None,
+    number_calibration_samples: int = 1024) -> str:
+    """
+    converts a generator to a TFLite flatbuffer, optionally with post training quantization -
+    int8 calibrates the activation ranges on standard normal noise (the latent distribution of the trainers),
+    inputs and outputs stay float32 so all variants are drop in replacements
+    """
+
+    assert quantization in tflite_quantizations, f'quantization needs to be one of {tflite_quantizations} - got {quantization}'
+
+    # converted from the keras model, which freezes the weights - int8 calibration cannot read resource variables
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    latent_space_shape = model.input_shape[-1]
+
+    if quantization is not None:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if quantization == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+
+    elif quantization == 'int8':
+        rng = np.random.default_rng(0)
+
+        def representative_dataset():
+            for _ in range(number_calibration_samples // 32):
+                yield [rng.standard_normal((32, latent_space_shape), dtype=np.float32)]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    with open(path, 'wb') as f:
+        f.write(converter.convert())
+
+    return path
+
+
+class TFLiteGenerator:
+    # callable around a tflite interpreter, the input is resized whenever the batch size changes
+
+    def __init__(self, path: str, number_threads: int = None):
+        self.interpreter = tf.lite.Interpreter(model_path=path, num_threads=number_threads)
+        self.interpreter.allocate_tensors()
+        self.input_index = self.interpreter.get_input_details()[0]['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self.batch_size = None
+
+    def __call__(self, noise: np.ndarray) -> np.ndarray:
+        if noise.shape[0] != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input_index, noise.shape)
+            self.interpreter.allocate_tensors()
+            self.batch_size = noise.shape[0]
+
+        self.interpreter.set_tensor(self.input_index, noise)
+        self.interpreter.invoke()
+
+        return self.interpreter.get_tensor(self.output_index)
+
+
+def export_generator(
+    h5_path: str,
+    directory: str = None,
+    quantizations: tuple = tflite_quantizations) -> dict:
+    """
+    exports a .h5 generator as SavedModel (directory/saved_model) and one TFLite flatbuffer per quantization,
+    returns {format name: path} - directory defaults to ../models/<file name>_export
+    """
+
+    name = os.path.splitext(os.path.basename(h5_path))[0]
+    directory = directory or os.path.join(models_root, f'{name}_export')
+    os.makedirs(directory, exist_ok=True)
+
+    model = tf.keras.models.load_model(h5_path, compile=False)
+    saved_model_directory = export_saved_model(model, os.path.join(directory, 'saved_model'))
+
+    paths = {'h5': h5_path, 'saved_model': saved_model_directory}
+    for quantization in quantizations:
+        format_name = f'tflite_{quantization}' if quantization else 'tflite'
+        paths[format_name] = export_tflite(
+            model,
+            os.path.join(directory, f'{format_name}.tflite'),
+            quantization=quantization)
+
+    return paths
+
+
+if __name__ == '__main__':
+
+    for format_name, path in export_generator(os.path.join(models_root, 'best_generator.h5')).items():
+        print(f'{format_name:>16} {path}')
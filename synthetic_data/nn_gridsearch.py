@@ -1,4 +1,3 @@
-import os
 import time
 import numpy as np
 from scipy.stats import reciprocal
@@ -9,9 +8,8 @@ from tensorflow.keras.wrappers.scikit_learn import KerasClassifier
 from tensorflow.keras.callbacks import TensorBoard, ModelCheckpoint, EarlyStopping
 from sklearn.model_selection import RandomizedSearchCV
 from process_data import process_data
-
-
-root_logdir = os.path.relpath('../custom_logs')
+from dtype_policy import as_floatx
+from run_logs import root_logdir, logdir
 
 
 def make_model(
@@ -50,17 +48,6 @@ def make_model(
     return model
 
 
-def logdir(hyperparam_note=None) -> str:
-    
-    
-    run_d = time.strftime(
-        f'run_%Y_%m_%d-%H_%M_%S{"_" + hyperparam_note if hyperparam_note is not None else ""}')
-    
-    directory = os.path.join(root_logdir, run_d)
-    
-    return directory
-
-
 def nn_gridsearch(
     make_model_function,
     x_train: np.ndarray = None,
@@ -95,8 +82,9 @@ def nn_gridsearch(
     if save_logs:
         callbacks.append(TensorBoard(logdir()))
     
+    # converted once - keras would cast float64 inputs on every batch of every fold
     rnd_search_cv.fit(
-        x_train, y_train, 
+        as_floatx(x_train), y_train, 
         epochs=epochs,
         validation_split=validation_split,
         callbacks=callbacks)
@@ -0,0 +1,257 @@
+import os
+import json
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from dtype_policy import label_dtype
+
+
+# no tensorflow import at module level - sampling from an exported generator only needs numpy
+models_root = os.path.relpath('../models')
+
+SELU_ALPHA = 1.6732632423543772
+SELU_SCALE = 1.0507009873554805
+
+activations = {
+    'linear': lambda x, alpha: x,
+    'relu': lambda x, alpha: np.maximum(x, 0),
+    'leaky_relu': lambda x, alpha: np.where(x > 0, x, x * alpha),
+    'elu': lambda x, alpha: np.where(x > 0, x, np.expm1(np.minimum(x, 0))),
+    'selu': lambda x, alpha: SELU_SCALE * np.where(x > 0, x, SELU_ALPHA * np.expm1(np.minimum(x, 0))),
+    'tanh': lambda x, alpha: np.tanh(x),
+    'sigmoid': lambda x, alpha: 1 / (1 + np.exp(-x))}
+
+
+def _activation_spec(activation) -> tuple:
+    # keras stores activations as a name, or as a serialized layer (e.g. LeakyReLU passed to an Activation layer)
+    if isinstance(activation, dict):
+        config = activation.get('config', {})
+        name = activation['class_name']
+        if name == 'LeakyReLU':
+            return 'leaky_relu', float(config.get('alpha', config.get('negative_slope', 0.3)))
+        activation = name
+
+    activation = activation.lower()
+    assert activation in activations, f'activation {activation} is not supported'
+
+    return activation, 0.
+
+
+def fold_layers(layers: list) -> list:
+    """
+    turns (class name, config, weights) of a sequential keras model into [(kernel, bias, activation, alpha)]
+
+    dropout and input layers are dropped (identity at inference), an inference mode BatchNormalization directly after a
+    Dense layer is folded into its kernel and bias: scale = gamma / sqrt(moving_variance + epsilon),
+    kernel * scale, (bias - moving_mean) * scale + beta - activations are attached to the Dense layer before them
+    """
+
+    folded = []
+
+    for class_name, config, weights in layers:
+        if class_name in ('InputLayer',) or 'Dropout' in class_name:
+            continue
+
+        if class_name == 'Dense':
+            kernel = weights['kernel'].astype(np.float32)
+            bias = weights.get('bias', np.zeros(kernel.shape[1], dtype=np.float32)).astype(np.float32)
+            folded.append([kernel, bias, 'linear', 0.])
+            activation = config.get('activation', 'linear')
+
+        elif class_name == 'BatchNormalization':
+            assert folded and folded[-1][2] == 'linear', 'BatchNormalization can only be folded right after a Dense layer'
+            kernel, bias = folded[-1][:2]
+            mean, variance = weights['moving_mean'], weights['moving_variance']
+            gamma = weights.get('gamma', np.ones_like(mean))
+            beta = weights.get('beta', np.zeros_like(mean))
+
+            scale = gamma / np.sqrt(variance + config.get('epsilon', 1e-3))
+            folded[-1][0] = (kernel * scale).astype(np.float32)
+            folded[-1][1] = ((bias - mean) * scale + beta).astype(np.float32)
+            continue
+
+        elif class_name == 'Activation':
+            activation = config['activation']
+
+        elif class_name in ('LeakyReLU', 'ReLU'):
+            activation = {'class_name': class_name, 'config': config}
+
+        else:
+            raise ValueError(f'layer {class_name} is not supported')
+
+        assert folded and folded[-1][2] == 'linear', f'{class_name} needs a Dense layer before it'
+        folded[-1][2:] = _activation_spec(activation)
+
+    return [tuple(layer) for layer in folded]
+
+
+def read_h5_layers(path: str) -> list:
+    # layer configs and weights straight from a keras .h5 file, with h5py only
+    import h5py
+
+    with h5py.File(path, 'r') as f:
+        config = json.loads(f.attrs['model_config'])
+        model_weights = f['model_weights']
+
+        layers = []
+        for layer in config['config']['layers']:
+            name = layer['config']['name']
+            weights = {}
+
+            if name in model_weights:
+                group = model_weights[name]
+                for weight_name in group.attrs['weight_names']:
+                    weight_name = weight_name.decode() if isinstance(weight_name, bytes) else weight_name
+                    weights[weight_name.split('/')[-1].split(':')[0]] = group[weight_name][()]
+
+            layers.append((layer['class_name'], layer['config'], weights))
+
+    return layers
+
+
+def keras_model_layers(model) -> list:
+    layers = []
+
+    for layer in model.layers:
+        weights = {weight.name.split('/')[-1].split(':')[0]: weight.numpy() for weight in layer.weights}
+        layers.append((layer.__class__.__name__, layer.get_config(), weights))
+
+    return layers
+
+
+class NumpyGenerator:
+    """
+    generator inference as batched float32 numpy matmuls - (kernel, bias, activation) per folded Dense layer
+
+    built from a keras .h5 file (from_h5, h5py only), a live keras model (from_keras_model) or an exported .npz (load) -
+    sample() uses the same block layout as generate_data.generate_batches: noise per block of block_size rows
+    from its own seed (seed, block), so the output does not depend on chunk_size or number_threads -
+    the noise comes from numpy's rng, so samples match generate_data in distribution, not row by row
+    """
+
+    def __init__(self, layers: list):
+        self.layers = layers
+        self.latent_space_shape = layers[0][0].shape[0]
+        self.number_output_units = layers[-1][0].shape[1]
+
+    @classmethod
+    def from_h5(cls, path: str):
+        return cls(fold_layers(read_h5_layers(path)))
+
+    @classmethod
+    def from_keras_model(cls, model):
+        return cls(fold_layers(keras_model_layers(model)))
+
+    def save(self, path: str):
+        arrays = {}
+        for i, (kernel, bias, _, _) in enumerate(self.layers):
+            arrays[f'kernel_{i}'] = kernel
+            arrays[f'bias_{i}'] = bias
+
+        spec = [(activation, alpha) for _, _, activation, alpha in self.layers]
+        np.savez(path, spec=json.dumps(spec), **arrays)
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as arrays:
+            spec = json.loads(str(arrays['spec']))
+            layers = [
+                (arrays[f'kernel_{i}'], arrays[f'bias_{i}'], activation, alpha)
+                for i, (activation, alpha) in enumerate(spec)]
+
+        return cls(layers)
+
+    def __call__(self, noise: np.ndarray) -> np.ndarray:
+        # computes in the dtype of the weights - float32, unless built from float64 weights as a reference
+        x = np.asarray(noise, dtype=self.layers[0][0].dtype)
+
+        for kernel, bias, activation, alpha in self.layers:
+            x = activations[activation](x @ kernel + bias, x.dtype.type(alpha))
+
+        return x
+
+    def latent_block(
+        self,
+        seed: int,
+        block: int,
+        block_size: int = 1024,
+        latent_space_mode: str = 'normal') -> np.ndarray:
+
+        rng = np.random.default_rng([seed, block])
+        shape = (block_size, self.latent_space_shape)
+
+        if latent_space_mode == 'uniform':
+            return rng.uniform(-1.0, 1.0, size=shape).astype(np.float32)
+
+        return rng.standard_normal(size=shape, dtype=np.float32)
+
+    def sample(
+        self,
+        number_samples: int = 50,
+        seed: int = 42,
+        latent_space_mode: str = 'normal',
+        block_size: int = 1024,
+        number_threads: int = 1) -> dict:
+        # blocks are independent, numpy releases the gil in the matmuls - threads work on separate blocks
+        data = np.empty((number_samples, self.number_output_units), dtype=np.float32)
+
+        def generate_block(block):
+            start = block * block_size
+            end = min(start + block_size, number_samples)
+            data[start:end] = self(self.latent_block(seed, block, block_size, latent_space_mode))[:end - start]
+
+        number_blocks = -(-number_samples // block_size)
+        if number_threads > 1:
+            with ThreadPoolExecutor(max_workers=number_threads) as executor:
+                list(executor.map(generate_block, range(number_blocks)))
+        else:
+            for block in range(number_blocks):
+                generate_block(block)
+
+        result = {
+            'x_train': data[:, :-1],
+            'y_train': (data[:, -1] >= 0).astype(label_dtype)}
+
+        return result
+
+
+def check_parity(
+    path: str,
+    number_samples: int = 4096,
+    seed: int = 0,
+    atol: float = 1e-5) -> float:
+    """
+    max absolute difference between the folded numpy engine and model(noise, training=False) for the .h5 in path
+
+    raises if it is larger than atol, unless the engine is still at least as close to a float64 evaluation of the
+    same layers as keras is - deep and wide generators reach pre activations in the thousands, where float32
+    roundoff alone is well above any fixed tolerance
+    """
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(path, compile=False)
+    engine = NumpyGenerator.from_h5(path)
+    reference = NumpyGenerator([
+        (kernel.astype(np.float64), bias.astype(np.float64), activation, alpha)
+        for kernel, bias, activation, alpha in engine.layers])
+
+    noise = np.random.default_rng(seed).standard_normal((number_samples, engine.latent_space_shape), dtype=np.float32)
+    keras_output = model(noise, training=False).numpy()
+    engine_output = engine(noise)
+    reference_output = reference(noise)
+
+    difference = float(np.max(np.abs(engine_output - keras_output)))
+    engine_error = float(np.max(np.abs(engine_output - reference_output)))
+    keras_error = float(np.max(np.abs(keras_output - reference_output)))
+
+    assert difference <= atol or engine_error <= 2 * keras_error, \
+        f'{path}: numpy engine differs from keras by {difference} (float64 error {engine_error} vs keras {keras_error})'
+
+    return difference
+
+
+if __name__ == '__main__':
+
+    # parity of every exported generator in ../models
+    for name in sorted(os.listdir(models_root)):
+        if name.endswith('.h5') and 'generator' in name:
+            print(f'{name:>50} max abs difference {check_parity(os.path.join(models_root, name)):.2e}')
@@ -1,6 +1,6 @@
 import math
 from tensorflow import keras
-from nn_gridsearch import logdir
+from run_logs import logdir
 
 
 K = keras.backend
@@ -51,9 +51,9 @@ class OneCycleScheduler(keras.callbacks.Callback):
         
         
 if __name__ == '__main__':
-    from process_data import process_data
+    from process_data import load_processed_data
     
-    data = process_data()
+    data = load_processed_data()
     
     x_train = data['x_train_processed']
     y_train = data['y_train']
@@ -0,0 +1,180 @@
+import os
+import shutil
+import tempfile
+import contextlib
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from dtype_policy import floatx, label_dtype
+
+
+# per worker process: the generator and its inference function, loaded once by the pool initializer
+_worker = {}
+
+
+def shared_directory() -> str:
+    # /dev/shm is ram backed on linux - memmaps there are plain shared memory between the processes
+    return '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+@contextlib.contextmanager
+def _environment(**variables):
+    # spawned workers inherit the environment at start - tensorflow reads its thread pool sizes from it
+    # when it initializes, which happens on import of the main module already, before any initializer runs
+    previous = {name: os.environ.get(name) for name in variables}
+    os.environ.update(variables)
+
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def _init_worker(
+    model_path: str,
+    block_size: int,
+    latent_space_shape: int):
+
+    import tensorflow as tf
+    from generate_data import inference_function
+
+    _worker['model'] = tf.keras.models.load_model(model_path, compile=False)
+    _worker['inference'] = inference_function(_worker['model'], block_size, latent_space_shape)
+
+
+def _generate_blocks(
+    first_block: int,
+    last_block: int,
+    x_path: str,
+    y_path: str,
+    seed: int,
+    number_samples: int,
+    block_size: int,
+    latent_space_shape: int,
+    latent_space_mode: str,
+    labels: np.ndarray) -> int:
+    # writes the rows of blocks [first_block, last_block) in place - only the row count goes back to the parent
+    # labels are the ones of these blocks only
+    from generate_data import generate_block, split_samples
+
+    x_train = np.load(x_path, mmap_mode='r+')
+    y_train = np.load(y_path, mmap_mode='r+')
+
+    number_rows = 0
+    for block in range(first_block, last_block):
+        offset = (block - first_block) * block_size
+        data = generate_block(
+            _worker['inference'],
+            block,
+            seed,
+            number_samples,
+            block_size,
+            latent_space_shape,
+            latent_space_mode,
+            None if labels is None else labels[offset:offset + block_size])
+
+        start = block * block_size
+        samples = split_samples(data, conditional=labels is not None)
+        x_train[start:start + data.shape[0]] = samples['x_train']
+        y_train[start:start + data.shape[0]] = samples['y_train']
+        number_rows += data.shape[0]
+
+    x_train.flush()
+    y_train.flush()
+
+    return number_rows
+
+
+def generate_parallel(
+    model,
+    x_path: str = None,
+    y_path: str = None,
+    latent_space_shape: int = 8,
+    number_samples: int = 50,
+    seed: int = 42,
+    latent_space_mode: str = 'normal',
+    block_size: int = 1024,
+    labels: np.ndarray = None,
+    number_workers: int = None,
+    blocks_per_task: int = 16) -> dict:
+    """
+    generate_to_npy over a process pool - every task generates a range of blocks and writes them straight into
+    the preallocated .npy files at their row offset, nothing is pickled back to the parent
+
+    rows only depend on (seed, block) like in generate_batches, so the result is bit identical to the single
+    process one for any number_workers - model is a keras model or the path of a saved one (workers load it once)
+
+    without paths the files go to a temporary directory in /dev/shm and are unlinked once the parent mapped them:
+    the returned arrays are zero copy views of the shared pages, freed with the last reference to them
+    """
+
+    assert latent_space_mode in ('uniform', 'normal'), f'latent space mode needs to be uniform or normal - got {latent_space_mode}'
+    assert labels is None or len(labels) == number_samples, f'need one label per sample - got {len(labels)} for {number_samples}'
+
+    import tensorflow as tf
+
+    number_workers = number_workers or os.cpu_count()
+    directory = tempfile.mkdtemp(prefix='synthetic_', dir=shared_directory())
+
+    try:
+        if isinstance(model, str):
+            model_path = model
+            model = tf.keras.models.load_model(model_path, compile=False)
+        else:
+            model_path = os.path.join(directory, 'generator.h5')
+            tf.keras.models.save_model(model, model_path)
+
+        number_features = model.output_shape[-1]
+
+        if x_path is None:
+            x_path = os.path.join(directory, 'x.npy')
+            y_path = os.path.join(directory, 'y.npy')
+
+        # the parent only writes the headers, the workers fill the rows
+        np.lib.format.open_memmap(x_path, mode='w+', dtype=floatx(), shape=(number_samples, number_features - 1))
+        np.lib.format.open_memmap(y_path, mode='w+', dtype=label_dtype, shape=(number_samples,))
+
+        number_blocks = -(-number_samples // block_size)
+        tasks = [(first, min(first + blocks_per_task, number_blocks)) for first in range(0, number_blocks, blocks_per_task)]
+        model_latent_space_shape = latent_space_shape + int(labels is not None)
+
+        # spawned, not forked - a forked tensorflow runtime is not safe to use -
+        # every worker gets its share of the cores instead of a thread pool the size of the machine
+        with _environment(
+                TF_NUM_INTRAOP_THREADS=str(max(os.cpu_count() // number_workers, 1)),
+                TF_NUM_INTEROP_THREADS='1'), ProcessPoolExecutor(
+                max_workers=min(number_workers, len(tasks)) or 1,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(model_path, block_size, model_latent_space_shape)) as executor:
+            futures = [
+                executor.submit(
+                    _generate_blocks,
+                    first,
+                    last,
+                    x_path,
+                    y_path,
+                    seed,
+                    number_samples,
+                    block_size,
+                    latent_space_shape,
+                    latent_space_mode,
+                    None if labels is None else labels[first * block_size:last * block_size])
+                for first, last in tasks]
+            number_rows = sum(future.result() for future in futures)
+
+        assert number_rows == number_samples, f'workers wrote {number_rows} of {number_samples} rows'
+
+        result = {
+            'x_train': np.load(x_path, mmap_mode='r'),
+            'y_train': np.load(y_path, mmap_mode='r')}
+
+    finally:
+        # mapped pages stay valid after the files are unlinked
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return result
@@ -1,3 +1,4 @@
+import pickle
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
@@ -6,10 +7,97 @@ from sklearn.pipeline import Pipeline
 from sklearn.experimental import enable_iterative_imputer
 from sklearn.impute import IterativeImputer
 from sklearn.preprocessing import OneHotEncoder, StandardScaler, MinMaxScaler
+from dataset_artifacts import DatasetArtifact, LazyDataset
+from dtype_policy import as_floatx, label_dtype
 #from generate_data import generate_data
 #from train_generator import train_generator
 
 
+class FittedPreprocessor:
+    """
+    the fitted process_data pipeline for new batches - transform never refits, inverse_transform maps processed rows
+    (e.g. generator output) back to raw feature values, both vectorized per batch, so they work on streams of chunks
+
+    transform returns arrays in the float dtype policy, it runs the iterative imputer only if a batch has missing values - it leaves complete rows unchanged,
+    and synthetic or cleaned batches skip all its estimator rounds
+    inverse_transform picks the category with the highest score per one hot group, undoes the scalers, clips
+    to the training range and rounds integer_columns - columns dropped by the pipeline cannot be recovered
+    """
+
+    def __init__(
+        self,
+        pipeline: Pipeline,
+        integer_columns: tuple = (),
+        label_column: str = 'label'):
+
+        self.pipeline = pipeline
+        self.transformer = pipeline.named_steps['transform']
+        self.imputer = pipeline.named_steps['impute']
+        self.integer_columns = tuple(integer_columns)
+        self.label_column = label_column
+
+        # (fitted transformer, raw columns, processed column slice) in output order
+        self.blocks = []
+        start = 0
+        for _, transformer, columns in self.transformer.transformers_:
+            if transformer == 'drop':
+                continue
+
+            width = sum(len(c) for c in transformer.categories_) if hasattr(transformer, 'categories_') else len(columns)
+            self.blocks.append((transformer, list(columns), slice(start, start + width)))
+            start += width
+
+        self.columns = [column for _, columns, _ in self.blocks for column in columns]
+
+    def transform(self, x: pd.DataFrame) -> np.ndarray:
+        transformed = self.transformer.transform(x)
+        if hasattr(transformed, 'toarray'):
+            transformed = transformed.toarray()
+
+        if np.isnan(transformed).any():
+            transformed = self.imputer.transform(transformed)
+
+        return as_floatx(transformed)
+
+    def inverse_transform(self, x_processed: np.ndarray) -> pd.DataFrame:
+        raw = {}
+
+        for transformer, columns, columns_slice in self.blocks:
+            block = x_processed[:, columns_slice]
+
+            if hasattr(transformer, 'categories_'):
+                start = 0
+                for column, categories in zip(columns, transformer.categories_):
+                    raw[column] = categories[np.argmax(block[:, start:start + len(categories)], axis=1)]
+                    start += len(categories)
+
+            else:
+                if hasattr(transformer, 'data_min_'):
+                    block = np.clip(block, *transformer.feature_range)
+
+                for column, values in zip(columns, transformer.inverse_transform(block).T):
+                    raw[column] = np.round(values) if column in self.integer_columns else values
+
+        return pd.DataFrame(raw, columns=self.columns)
+
+    def inverse_transform_batches(self, batches):
+        # raw feature frames with the label for a stream of {'x_train', 'y_train'} chunks, e.g. generate_batches
+        for chunk in batches:
+            raw = self.inverse_transform(chunk['x_train'])
+            raw[self.label_column] = chunk['y_train']
+
+            yield raw
+
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
 def process_data(
 #    include_synthetic: bool=False,
 #    synthetic_share: float=0.2,
@@ -62,10 +150,12 @@ def process_data(
     
     # chain transformer and imputation
     pipeline = Pipeline([('transform', transformer), ('impute', IterativeImputer(min_value=0))])
-    x_train_processed = pipeline.fit_transform(x_train)
-    x_test_processed = pipeline.fit_transform(x_test)
+    x_train_processed = as_floatx(pipeline.fit_transform(x_train))
+    # fitted on the training split only - the test split gets the training statistics
+    preprocessor = FittedPreprocessor(pipeline, integer_columns=('pclass', 'sibsp', 'parch'), label_column='survived')
+    x_test_processed = preprocessor.transform(x_test)
         
-    y_train = y_train.values
+    y_train = y_train.values.astype(label_dtype)
     
 #    if real_share != 1.0:
 #        # shorten real data
@@ -117,16 +207,26 @@ def process_data(
         'x_test': x_test.values, 
         'x_test_processed': x_test_processed, 
         'y_train': y_train,
-        'y_test': y_test.values,
-        'pipeline': pipeline}    
+        'y_test': y_test.values.astype(label_dtype),
+        'pipeline': pipeline,
+        'preprocessor': preprocessor}    
     
     return result
 
 
+# rebuilt when titanic.csv, process_data or the numpy / sklearn versions change
+titanic_artifact = DatasetArtifact('titanic', build=process_data, sources=('../data/titanic.csv',))
+
+
+def load_processed_data() -> LazyDataset:
+    # process_data from the artifact cache - nothing is read or computed before the first key is accessed
+    return titanic_artifact.lazy()
+
+
 if __name__ == '__main__':
     data = process_data()
 
-    for k, v in filter(lambda x: x[0] != 'pipeline', data.items()):
+    for k, v in filter(lambda x: x[0] not in ('pipeline', 'preprocessor'), data.items()):
         
         np.save(f'../data/titanic_{k}.npy', v)
         print(f'{k} -  {type(v)} - {v.shape}')
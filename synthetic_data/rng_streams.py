@@ -0,0 +1,72 @@
+import zlib
+import random
+import numpy as np
+
+
+# no tensorflow import at module level - numpy only workers can derive their streams without it
+
+
+def _spawn_key(name) -> int:
+    # integers (worker, chunk, run index) are used as they are, names go through a stable 32 bit hash
+    if isinstance(name, (int, np.integer)):
+        return int(name)
+
+    return zlib.crc32(str(name).encode())
+
+
+class RandomStreams:
+    """
+    independent, reproducible random streams derived from one experiment seed
+
+    a stream is addressed by a path of names and indices, e.g. streams.stream('boost', 3, 'generator') -
+    its seed is numpys SeedSequence(seed, spawn_key=path), so it only depends on the root seed and the path:
+    not on call order, on which process asks for it or on how many other streams exist -
+    work fanned out to workers or chunks gets bit identical randomness for any degree of parallelism
+
+    unlike tf.random.Generator.split, which advances the parent, deriving a stream has no side effects
+    """
+
+    def __init__(self, seed: int = 42, path: tuple = ()):
+        self.root_seed = seed
+        self.path = tuple(path)
+        self.sequence = np.random.SeedSequence(seed, spawn_key=tuple(_spawn_key(name) for name in self.path))
+
+    def __repr__(self) -> str:
+        return f'RandomStreams(seed={self.root_seed}, path={self.path})'
+
+    def stream(self, *names) -> 'RandomStreams':
+        return RandomStreams(self.root_seed, self.path + names)
+
+    def spawn(self, number_streams: int, name: str = 'worker') -> list:
+        # one stream per worker / chunk - stream i is the same whatever number_streams is
+        return [self.stream(name, i) for i in range(number_streams)]
+
+    def seed(self) -> int:
+        # 32 bit, valid for np.random.RandomState, tf.random.set_seed, Generator.from_seed and the stateless ops
+        return int(self.sequence.generate_state(1, np.uint32)[0])
+
+    def numpy(self) -> np.random.Generator:
+        # a new generator at the start of the stream on every call
+        return np.random.default_rng(self.sequence)
+
+    def tensorflow(self):
+        import tensorflow as tf
+
+        return tf.random.Generator.from_seed(self.seed())
+
+    def seed_globals(self):
+        # for the code that draws from global state - keras initializers, np.random, random
+        import tensorflow as tf
+
+        seed = self.seed()
+        random.seed(seed)
+        np.random.seed(seed)
+        tf.random.set_seed(seed)
+
+
+def stream_seed(
+    streams: RandomStreams,
+    name: str,
+    default: int = 42) -> int:
+    # seed of a named stream, or the fixed default when no streams are used
+    return default if streams is None else streams.stream(name).seed()
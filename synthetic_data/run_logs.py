@@ -0,0 +1,15 @@
+import os
+import time
+
+
+root_logdir = os.path.relpath('../custom_logs')
+
+
+def logdir(hyperparam_note=None) -> str:
+    # one timestamped run directory per call under root_logdir, shared by the tensorboard and telemetry logs
+    run_d = time.strftime(
+        f'run_%Y_%m_%d-%H_%M_%S{"_" + hyperparam_note if hyperparam_note is not None else ""}')
+    
+    directory = os.path.join(root_logdir, run_d)
+    
+    return directory
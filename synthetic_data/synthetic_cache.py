@@ -0,0 +1,239 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import numpy as np
+import tensorflow as tf
+from generate_data import generate_to_npy
+from dataset_artifacts import file_sha256
+from dtype_policy import floatx
+
+
+cache_root = os.path.relpath('../cache/synthetic')
+
+
+def layer_configs(model: tf.keras.Model) -> list:
+    # class and config of every layer, nested models unrolled - without the layer names keras numbers per instance
+    configs = []
+
+    for layer in model.layers:
+        if hasattr(layer, 'layers'):
+            configs.append(layer_configs(layer))
+        else:
+            config = {key: value for key, value in layer.get_config().items() if key != 'name'}
+            configs.append([layer.__class__.__name__, config])
+
+    return configs
+
+
+def weights_fingerprint(model: tf.keras.Model) -> str:
+    # sha256 over the layer configs and shape, dtype and bytes of every weight - the same model gives the same key,
+    # whatever file it came from, while equal weights under a different activation or layer setup don't
+    digest = hashlib.sha256()
+    digest.update(json.dumps(layer_configs(model), sort_keys=True, default=str).encode())
+
+    for weight in model.get_weights():
+        digest.update(f'{weight.shape}{weight.dtype}'.encode())
+        digest.update(np.ascontiguousarray(weight).tobytes())
+
+    return digest.hexdigest()
+
+
+def file_stat(path: str) -> dict:
+    stat = os.stat(path)
+
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class SyntheticCache:
+    """
+    content addressed on disk cache for generated synthetic samples
+
+    entries are keyed by a hash of the generator layer configs and weights, latent shape / mode, seed, block size
+    and sample count -
+    every entry is a directory with x.npy / y.npy (opened as memmaps on a hit) and a manifest with the sha256, size and
+    modification time of both files - a hit only compares size and modification time, the files are hashed again
+    when those changed (or on every hit with rehash=True), corrupt or incomplete entries are dropped and regenerated
+
+    the directory is written under a temporary name and renamed when complete, so readers never see partial entries -
+    the manifests modification time is the last access, the least recently used entries are evicted once
+    the cache grows over max_bytes
+    """
+
+    def __init__(
+        self,
+        directory: str = cache_root,
+        max_bytes: int = 4 * 2 ** 30,
+        verify: bool = True,
+        rehash: bool = False):
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.verify = verify
+        self.rehash = rehash
+
+    def key(
+        self,
+        model: tf.keras.Model,
+        latent_space_shape: int = 8,
+        latent_space_mode: str = 'normal',
+        seed: int = 42,
+        number_samples: int = 50,
+        block_size: int = 1024) -> str:
+
+        params = {
+            'weights': weights_fingerprint(model),
+            'latent_space_shape': latent_space_shape,
+            'latent_space_mode': latent_space_mode,
+            'seed': seed,
+            'number_samples': number_samples,
+            'block_size': block_size,
+            'floatx': np.dtype(floatx()).name}
+
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> dict:
+        # memmapped arrays of a valid entry, None on a miss
+        entry = self._entry(key)
+        manifest_path = os.path.join(entry, 'manifest.json')
+
+        if not os.path.exists(manifest_path):
+            return None
+
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+        stats = manifest.setdefault('stat', {})
+        rehashed = False
+
+        for name in ('x', 'y'):
+            path = os.path.join(entry, f'{name}.npy')
+            exists = os.path.exists(path)
+
+            # a file with the size and modification time it was written with is not read again
+            if exists and self.verify and (self.rehash or stats.get(name) != file_stat(path)):
+                exists = file_sha256(path) == manifest['sha256'][name]
+                stats[name] = file_stat(path)
+                rehashed = True
+
+            if not exists:
+                print(f'synthetic cache entry {key[:12]} failed the integrity check, regenerating')
+                shutil.rmtree(entry, ignore_errors=True)
+
+                return None
+
+        if rehashed:
+            # the files are intact, only their modification time changed - not hashed again on the next hit
+            with open(f'{manifest_path}.tmp-{os.getpid()}', 'w') as f:
+                json.dump(manifest, f)
+            os.replace(f'{manifest_path}.tmp-{os.getpid()}', manifest_path)
+        else:
+            os.utime(manifest_path)
+
+        result = {
+            'x_train': np.load(os.path.join(entry, 'x.npy'), mmap_mode='r'),
+            'y_train': np.load(os.path.join(entry, 'y.npy'), mmap_mode='r')}
+
+        return result
+
+    def put(
+        self,
+        key: str,
+        model: tf.keras.Model,
+        **generate_kwargs) -> dict:
+
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = self._entry(f'{key}.tmp-{os.getpid()}')
+        os.makedirs(temporary, exist_ok=True)
+
+        generate_to_npy(
+            model,
+            x_path=os.path.join(temporary, 'x.npy'),
+            y_path=os.path.join(temporary, 'y.npy'),
+            **generate_kwargs)
+
+        manifest = {
+            'key': key,
+            'created': time.time(),
+            'sha256': {name: file_sha256(os.path.join(temporary, f'{name}.npy')) for name in ('x', 'y')},
+            'stat': {name: file_stat(os.path.join(temporary, f'{name}.npy')) for name in ('x', 'y')},
+            'generate': generate_kwargs}
+
+        with open(os.path.join(temporary, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f)
+
+        # another process may have finished the same entry in the meantime - both are identical, keep theirs
+        try:
+            os.rename(temporary, self._entry(key))
+        except OSError:
+            shutil.rmtree(temporary, ignore_errors=True)
+
+        self.evict(keep=key)
+
+        return self.get(key)
+
+    def get_or_generate(
+        self,
+        model: tf.keras.Model,
+        latent_space_shape: int = 8,
+        latent_space_mode: str = 'normal',
+        seed: int = 42,
+        number_samples: int = 50,
+        block_size: int = 1024,
+        number_workers: int = 1) -> dict:
+        # number_workers is not part of the key, the samples are the same for any number of workers
+
+        key = self.key(model, latent_space_shape, latent_space_mode, seed, number_samples, block_size)
+        result = self.get(key)
+
+        if result is not None:
+            print(f'synthetic cache hit {key[:12]} - {number_samples} samples')
+
+            return result
+
+        return self.put(
+            key,
+            model,
+            latent_space_shape=latent_space_shape,
+            latent_space_mode=latent_space_mode,
+            seed=seed,
+            number_samples=number_samples,
+            block_size=block_size,
+            number_workers=number_workers)
+
+    def entries(self) -> list:
+        # (last access, bytes, key) of all complete entries, oldest first
+        entries = []
+
+        if not os.path.isdir(self.directory):
+            return entries
+
+        for key in os.listdir(self.directory):
+            manifest_path = os.path.join(self._entry(key), 'manifest.json')
+            if '.tmp-' in key or not os.path.exists(manifest_path):
+                continue
+
+            size = sum(
+                os.path.getsize(os.path.join(self._entry(key), name)) for name in os.listdir(self._entry(key)))
+            entries.append((os.path.getmtime(manifest_path), size, key))
+
+        return sorted(entries)
+
+    def evict(self, keep: str = None):
+        # least recently used first, until the cache fits into max_bytes - the entry in keep is never evicted
+        entries = self.entries()
+        total_bytes = sum(size for _, size, _ in entries)
+
+        for _, size, key in entries:
+            if total_bytes <= self.max_bytes:
+                break
+
+            if key == keep:
+                continue
+
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+            total_bytes -= size
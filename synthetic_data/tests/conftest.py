@@ -0,0 +1,9 @@
+import os
+import sys
+
+
+# the modules import each other script relative and read ../data, ../models relative to synthetic_data,
+# the tests run from there like the scripts do
+synthetic_data = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, synthetic_data)
+os.chdir(synthetic_data)
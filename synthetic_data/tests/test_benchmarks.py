@@ -0,0 +1,12 @@
+import numpy as np
+from benchmarks import benchmark_gradient_penalty
+
+
+def test_gradient_penalty_benchmark_runs_both_forms():
+    results = benchmark_gradient_penalty(batch_sizes=(4, 8), repeats=1)
+
+    assert [(row['penalty'], row['batch_size']) for row in results] == [
+        ('tabular', 4), ('tabular', 8), ('image', 4), ('image', 8)]
+    assert all(np.isfinite(row['ms_per_call']) for row in results)
+    # the image form interpolates batch times more elements
+    assert results[3]['interpolated_elements'] == 8 * results[1]['interpolated_elements']
@@ -0,0 +1,44 @@
+import numpy as np
+import train_generator
+import train_wasserstein_generator
+from rng_streams import RandomStreams
+
+
+def train(module, n_epochs: int, checkpoint_dir: str, **kwargs) -> dict:
+    x = np.random.default_rng(0).normal(size=(256, 12)).astype(np.float32)
+
+    return module.train_generator(
+        x,
+        n_epochs=n_epochs,
+        streams=RandomStreams(7),
+        checkpoint_dir=checkpoint_dir,
+        checkpoint_every=2,
+        generate_img=False,
+        export_generator=False,
+        **kwargs)
+
+
+def test_resume_is_exact(tmp_path):
+    for module in (train_generator, train_wasserstein_generator):
+        uninterrupted = train(module, 4, str(tmp_path / f'{module.__name__}_full'))
+
+        # stopped after epoch 2, then resumed from its checkpoint
+        train(module, 2, str(tmp_path / f'{module.__name__}_resumed'))
+        resumed = train(module, 4, str(tmp_path / f'{module.__name__}_resumed'))
+
+        np.testing.assert_array_equal(resumed['all_losses'], uninterrupted['all_losses'])
+        np.testing.assert_array_equal(resumed['all_d_vals'], uninterrupted['all_d_vals'])
+
+        for weights, resumed_weights in zip(uninterrupted['generator'].get_weights(), resumed['generator'].get_weights()):
+            np.testing.assert_array_equal(resumed_weights, weights)
+
+
+def test_resume_keeps_the_fidelity_scores(tmp_path):
+    options = dict(early_stopping=True, check_every=1, patience=10)
+    uninterrupted = train(train_generator, 4, str(tmp_path / 'full'), **options)
+
+    train(train_generator, 2, str(tmp_path / 'resumed'), **options)
+    resumed = train(train_generator, 4, str(tmp_path / 'resumed'), **options)
+
+    assert [epoch for epoch, _ in resumed['fidelity_scores']] == [1, 2, 3, 4]
+    assert resumed['fidelity_scores'] == uninterrupted['fidelity_scores']
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+from generate_data import generate_data
+from train_generator import train_generator, create_generator_network
+
+
+def test_class_counts_are_exact():
+    rng = np.random.default_rng(0)
+    x = np.column_stack((rng.normal(size=(256, 5)), rng.integers(0, 2, size=256))).astype(np.float32)
+    generator = train_generator(
+        x, n_epochs=1, conditional=True, generate_img=False, export_generator=False)['generator']
+
+    class_counts = {0: 37, 1: 1100}
+    result = generate_data(generator, class_counts=class_counts, seed=3)
+
+    labels, counts = np.unique(result['y_train'], return_counts=True)
+    assert dict(zip(labels.tolist(), counts.tolist())) == class_counts
+    assert result['x_train'].shape == (sum(class_counts.values()), 5)
+
+
+def test_class_counts_need_a_conditional_generator():
+    generator = create_generator_network(hidden_activation_function='selu', number_output_units=6)
+    generator.build((None, 8))
+
+    with pytest.raises(AssertionError, match='conditional=True'):
+        generate_data(generator, class_counts={0: 10, 1: 10}, seed=3)
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from critic_filter import StreamingTopK
+
+
+@pytest.mark.parametrize('k', [1, 40, 250, 1000])
+def test_streaming_top_k_is_a_stable_sort(k):
+    # few distinct scores, so ties straddle the cut of every update
+    rng = np.random.default_rng(k)
+    scores = rng.integers(0, 12, size=1000).astype(np.float32)
+    index = np.arange(1000)
+    top_k = StreamingTopK(k)
+
+    for start in range(0, 1000, 100):
+        chunk = slice(start, start + 100)
+        top_k.update(scores[chunk], index[chunk, None] * 2., index[chunk] % 2, index[chunk])
+
+    result = top_k.result()
+    expected = np.argsort(-scores, kind='stable')[:k]
+
+    np.testing.assert_array_equal(result['index'], expected)
+    np.testing.assert_array_equal(result['scores'], scores[expected])
+    # features and labels stay with their rows
+    np.testing.assert_array_equal(result['x_train'][:, 0], expected * 2.)
+    np.testing.assert_array_equal(result['y_train'], expected % 2)
+
+
+def test_streaming_top_k_without_updates():
+    assert StreamingTopK(3).result() is None
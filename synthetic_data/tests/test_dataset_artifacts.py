@@ -0,0 +1,63 @@
+import os
+import sys
+import importlib
+import subprocess
+import numpy as np
+import pytest
+from dataset_artifacts import DatasetArtifact
+
+
+@pytest.fixture
+def toy_build(tmp_path, monkeypatch):
+    # a build function whose module takes a helper from a module next to it
+    (tmp_path / 'toy_helper.py').write_text('def scale():\n    return 2\n')
+    (tmp_path / 'toy_build.py').write_text(
+        'import numpy as np\n'
+        'from toy_helper import scale\n\n'
+        'calls = []\n\n\n'
+        'def build():\n'
+        '    calls.append(1)\n'
+        '    return {"values": np.arange(3) * scale()}\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    for name in ('toy_helper', 'toy_build'):
+        sys.modules.pop(name, None)
+
+    return importlib.import_module('toy_build')
+
+
+def test_helper_edit_changes_fingerprint(toy_build, tmp_path):
+    artifact = DatasetArtifact('toy', build=toy_build.build, directory=str(tmp_path / 'cache'))
+    fingerprint = artifact.fingerprint()
+
+    (tmp_path / 'toy_helper.py').write_text('def scale():\n    return 3\n')
+
+    assert artifact.fingerprint() != fingerprint
+
+
+def test_warm_load_does_not_build(toy_build, tmp_path):
+    artifact = DatasetArtifact('toy', build=toy_build.build, directory=str(tmp_path / 'cache'))
+
+    np.testing.assert_array_equal(artifact.load()['values'], [0, 2, 4])
+    values = artifact.load()['values']
+
+    assert len(toy_build.calls) == 1
+    assert isinstance(values, np.memmap)
+    # the temporary entry was renamed, nothing is left next to the entry
+    assert [entry for entry in os.listdir(str(tmp_path / 'cache')) if '.tmp-' in entry] == []
+
+
+def test_interrupted_builds_are_removed(toy_build, tmp_path):
+    directory = tmp_path / 'cache'
+    finished = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'], capture_output=True, text=True)
+    interrupted = directory / f'toy-0123456789abcdef.tmp-{int(finished.stdout)}'
+    running = directory / f'toy-fedcba9876543210.tmp-{os.getpid()}'
+    other_name = directory / f'other-0123456789abcdef.tmp-{int(finished.stdout)}'
+
+    for path in (interrupted, running, other_name):
+        path.mkdir(parents=True)
+
+    DatasetArtifact('toy', build=toy_build.build, directory=str(directory)).load()
+
+    assert not interrupted.exists()
+    assert running.exists() and other_name.exists()
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+import datasets
+import dataset_artifacts
+import enhance_data
+from train_generator import train_generator
+
+
+@pytest.mark.parametrize('name', ['titanic', 'winequality', 'diabetes'])
+def test_chunked_layout_matches_in_memory(name, tmp_path):
+    in_memory = datasets.process_dataset(name)
+    chunked = datasets.process_dataset_chunked(name, chunk_size=500, directory=str(tmp_path))
+
+    assert chunked['x_train_processed'].shape[1] == in_memory['x_train_processed'].shape[1]
+
+    if datasets.schemas[name]['categorical']:
+        categories = [
+            data['pipeline'].named_steps['transform'].named_transformers_['onehotencode categories'].categories_
+            for data in (in_memory, chunked)]
+        for a, b in zip(*categories):
+            assert list(a.astype(str)) == list(b.astype(str))
+
+
+def test_missing_category_is_one_hot_encoded(tmp_path):
+    # titanic has rows without embarked - they get the nan column in both paths
+    in_memory = datasets.process_dataset('titanic')
+    chunked = datasets.process_dataset_chunked('titanic', chunk_size=500, directory=str(tmp_path))
+    missing = datasets.load_dataset('titanic')
+    missing = missing[missing['embarked'].isna()].drop(columns='survived')
+    assert not missing.empty
+
+    for data in (in_memory, chunked):
+        embarked = data['preprocessor'].transform(missing)[:, 2:6]
+        np.testing.assert_array_equal(embarked, np.tile([0, 0, 0, 1], (len(missing), 1)))
+
+
+def test_chunked_independent_of_chunk_size(tmp_path):
+    small = datasets.process_dataset_chunked('titanic', chunk_size=97, directory=str(tmp_path / 'small'))
+    large = datasets.process_dataset_chunked('titanic', chunk_size=5000, directory=str(tmp_path / 'large'))
+
+    for key in ('y_train', 'y_test'):
+        np.testing.assert_array_equal(small[key], large[key])
+    for key in ('x_train_processed', 'x_test_processed'):
+        np.testing.assert_allclose(small[key], large[key], rtol=1e-4, atol=1e-4)
+
+
+def test_enhance_chunked_titanic(monkeypatch, tmp_path):
+    # the chunked layout is not the one of the pre-trained titanic generators, a new one is trained
+    # artifacts go to tmp_path - the module root and the default DatasetArtifact bound to it
+    monkeypatch.setattr(dataset_artifacts, 'artifacts_root', str(tmp_path))
+    monkeypatch.setattr(
+        dataset_artifacts.DatasetArtifact.__init__, '__defaults__',
+        dataset_artifacts.DatasetArtifact.__init__.__defaults__[:-1] + (str(tmp_path),))
+    monkeypatch.setattr(
+        enhance_data, 'train_generator', lambda **kwargs: train_generator(**{**kwargs, 'generate_img': False}))
+
+    data = datasets.load_processed('titanic', chunk_size=500)
+    result = enhance_data.enhance_data(
+        dataset='titanic', dataset_chunk_size=500, generator_epochs=1, cache_synthetic=False, streams=None)
+
+    number_real = data['x_train_processed'].shape[0]
+    assert result['x_train_processed'].shape == (number_real + int(number_real * .2), data['x_train_processed'].shape[1])
+    assert result['y_train'].shape == (result['x_train_processed'].shape[0],)
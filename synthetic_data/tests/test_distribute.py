@@ -0,0 +1,83 @@
+import sys
+import subprocess
+import numpy as np
+from gan_distribute import run_local_workers
+from train_generator import train_generator
+
+
+def run_python(code: str) -> str:
+    # tensorflow devices can only be configured before the runtime starts - every check gets a fresh interpreter
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=600)
+    assert result.returncode == 0, result.stderr[-3000:]
+
+    return result.stdout
+
+
+def test_mirrored_trains_on_every_replica():
+    for module in ('train_generator', 'train_wasserstein_generator'):
+        output = run_python(f'''
+import numpy as np
+import tensorflow as tf
+from {module} import train_generator
+
+x = np.random.default_rng(0).normal(size=(512, 12)).astype(np.float32)
+result = train_generator(x, n_epochs=1, distribute='mirrored', number_replicas=2, generate_img=False, export_generator=False)
+print(len(tf.config.list_logical_devices('CPU')), result['all_losses'].shape[1])
+''')
+        # two logical cpus, 512 rows in global batches of 2 * 32
+        assert output.split()[-2:] == ['2', '8']
+
+
+def test_imports_leave_runtime_uninitialized():
+    # the strategy can still split the cpu after the trainers and the generation modules are imported
+    output = run_python('''
+import tensorflow as tf
+import generate_data, enhance_data, train_generator, train_wasserstein_generator
+from gan_distribute import make_strategy
+
+print(make_strategy('mirrored', number_replicas=2).num_replicas_in_sync)
+''')
+    assert output.split()[-1] == '2'
+
+
+def test_mirrored_raises_after_initialization():
+    output = run_python('''
+import tensorflow as tf
+from gan_distribute import make_strategy
+
+tf.constant(1.)
+try:
+    make_strategy('mirrored', number_replicas=2)
+except RuntimeError:
+    print('raised')
+''')
+    assert output.split()[-1] == 'raised'
+
+
+def test_local_workers_train():
+    x = np.random.default_rng(0).normal(size=(256, 12)).astype(np.float32)
+
+    exit_codes = run_local_workers(
+        train_generator,
+        training_data=x,
+        distribute='multi_worker',
+        n_epochs=1,
+        generate_img=False,
+        export_generator=False)
+
+    assert exit_codes == [0, 0]
+
+
+def test_mirrored_resume_says_it_is_not_exact(tmp_path):
+    output = run_python(f'''
+import numpy as np
+from train_generator import train_generator
+
+x = np.random.default_rng(0).normal(size=(512, 12)).astype(np.float32)
+for n_epochs in (1, 2):
+    train_generator(
+        x, n_epochs=n_epochs, distribute='mirrored', number_replicas=2, checkpoint_dir={str(tmp_path)!r},
+        checkpoint_every=1, generate_img=False, export_generator=False)
+''')
+    assert 'resuming from checkpoint' in output
+    assert 'data order and noise after the resume differ' in output
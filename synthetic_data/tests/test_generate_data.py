@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+from train_generator import create_generator_network
+from generate_data import generate_batches, generate_data, generate_to_npy
+from dtype_policy import floatx, label_dtype
+
+
+@pytest.fixture(scope='module')
+def generator() -> tf.keras.Model:
+    tf.random.set_seed(0)
+    model = create_generator_network(number_hidden_layers=2, hidden_activation_function='selu', number_output_units=12)
+    model.build(input_shape=(None, 8))
+
+    return model
+
+
+def test_chunk_size_invariant(generator):
+    reference = generate_data(generator, number_samples=2500, seed=3)
+
+    for chunk_size in (1, 100, 1024, 4096):
+        chunks = list(generate_batches(generator, number_samples=2500, chunk_size=chunk_size, seed=3))
+
+        assert max(chunk['y_train'].shape[0] for chunk in chunks) <= chunk_size
+        np.testing.assert_array_equal(np.concatenate([chunk['x_train'] for chunk in chunks]), reference['x_train'])
+        np.testing.assert_array_equal(np.concatenate([chunk['y_train'] for chunk in chunks]), reference['y_train'])
+
+
+def test_generate_to_npy_matches(generator, tmp_path):
+    reference = generate_data(generator, number_samples=700, seed=5)
+    result = generate_to_npy(
+        generator, str(tmp_path / 'x.npy'), str(tmp_path / 'y.npy'), number_samples=700, seed=5, chunk_size=128)
+
+    np.testing.assert_array_equal(result['x_train'], reference['x_train'])
+    np.testing.assert_array_equal(result['y_train'], reference['y_train'])
+
+
+def test_zero_samples(generator):
+    result = generate_data(generator, number_samples=0, seed=1)
+
+    assert result['x_train'].shape == (0, 11) and result['x_train'].dtype == floatx()
+    assert result['y_train'].shape == (0,) and result['y_train'].dtype == label_dtype
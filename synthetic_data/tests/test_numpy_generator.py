@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+import tensorflow as tf
+from numpy_generator import NumpyGenerator
+from train_generator import create_generator_network
+
+
+latent_space_shape = 8
+
+
+@pytest.fixture(scope='module')
+def model():
+    # a few training steps, so the BatchNormalization moving statistics are far from their initial 0 / 1
+    tf.keras.utils.set_random_seed(0)
+    model = create_generator_network(
+        number_hidden_layers=2,
+        number_hidden_units_power=4,
+        hidden_activation_function='selu',
+        number_output_units=6)
+    model.build((None, latent_space_shape))
+    optimizer = tf.keras.optimizers.Adam(learning_rate=0.01)
+    target = tf.random.normal((64, 6), seed=1)
+
+    for step in range(20):
+        noise = tf.random.normal((64, latent_space_shape), mean=1., stddev=3., seed=step)
+        with tf.GradientTape() as tape:
+            loss = tf.reduce_mean((model(noise, training=True) - target) ** 2)
+        optimizer.apply_gradients(zip(tape.gradient(loss, model.trainable_variables), model.trainable_variables))
+
+    batchnorm = [layer for layer in model.layers if isinstance(layer, tf.keras.layers.BatchNormalization)]
+    assert np.abs(batchnorm[0].moving_mean.numpy()).max() > 0.1
+
+    return model
+
+
+def noise(number_samples: int = 512) -> np.ndarray:
+    return np.random.default_rng(0).standard_normal((number_samples, latent_space_shape), dtype=np.float32)
+
+
+def test_from_keras_model_parity(model):
+    engine = NumpyGenerator.from_keras_model(model)
+
+    np.testing.assert_allclose(engine(noise()), model(noise(), training=False).numpy(), rtol=1e-5, atol=1e-5)
+
+
+def test_from_h5_parity(model, tmp_path):
+    path = str(tmp_path / 'generator.h5')
+    model.save(path)
+    engine = NumpyGenerator.from_h5(path)
+
+    np.testing.assert_allclose(engine(noise()), model(noise(), training=False).numpy(), rtol=1e-5, atol=1e-5)
+
+
+def test_npz_round_trip(model, tmp_path):
+    engine = NumpyGenerator.from_keras_model(model)
+    path = str(tmp_path / 'generator.npz')
+    engine.save(path)
+    loaded = NumpyGenerator.load(path)
+
+    assert [layer[2:] for layer in loaded.layers] == [layer[2:] for layer in engine.layers]
+    np.testing.assert_array_equal(loaded(noise()), engine(noise()))
+
+
+def test_sample_independent_of_threads_and_blocks(model):
+    # noise comes per block of block_size rows, threads only change which block is computed where
+    engine = NumpyGenerator.from_keras_model(model)
+    single = engine.sample(number_samples=2500, seed=3, block_size=256)
+    threaded = engine.sample(number_samples=2500, seed=3, block_size=256, number_threads=4)
+
+    for key in ('x_train', 'y_train'):
+        np.testing.assert_array_equal(single[key], threaded[key])
+
+    # every block is the engine applied to its own noise
+    block = engine.latent_block(3, 9, block_size=256)
+    np.testing.assert_array_equal(single['x_train'][9 * 256:], engine(block)[:2500 - 9 * 256, :-1])
+    assert single['x_train'].shape == (2500, 5) and single['y_train'].shape == (2500,)
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import numpy as np
+import pytest
+import tensorflow as tf
+from generate_data import generate_to_npy
+from parallel_generate import generate_parallel, shared_directory
+from train_generator import create_generator_network
+
+
+@pytest.fixture(scope='module')
+def model():
+    tf.keras.utils.set_random_seed(0)
+    model = create_generator_network(hidden_activation_function='selu', number_output_units=6)
+    model.build((None, 8))
+
+    return model
+
+
+def shared_entries() -> set:
+    # generate_parallel falls back to the temporary directory without /dev/shm
+    directory = shared_directory() or tempfile.gettempdir()
+
+    return {name for name in os.listdir(directory) if name.startswith('synthetic_')}
+
+
+def test_bit_identical_for_any_number_workers(model, tmp_path):
+    # several tasks of two blocks each, the last block partial
+    options = dict(number_samples=1000, seed=5, block_size=64)
+    single = generate_to_npy(model, str(tmp_path / 'x.npy'), str(tmp_path / 'y.npy'), chunk_size=300, **options)
+    results = [
+        generate_parallel(model, number_workers=number_workers, blocks_per_task=2, **options)
+        for number_workers in (1, 2)]
+
+    for result in results:
+        for key in ('x_train', 'y_train'):
+            assert result[key].dtype == single[key].dtype
+            assert np.array_equal(result[key], single[key])
+
+
+def test_shared_memory_is_released(model):
+    before = shared_entries()
+    result = generate_parallel(model, number_samples=300, block_size=64, number_workers=2)
+
+    # the arrays stay readable from the unlinked pages
+    assert result['x_train'].shape == (300, 5)
+    assert np.isfinite(result['x_train']).all()
+    assert shared_entries() == before
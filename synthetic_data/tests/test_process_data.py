@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datasets import process_dataset
+from dtype_policy import as_floatx
+from process_data import FittedPreprocessor, process_data
+
+
+def titanic_frames() -> list:
+    # process_data returns raw values - the frame columns are the ones its transformer was fitted on
+    data = process_data()
+    columns = data['pipeline'].named_steps['transform'].feature_names_in_
+    frames = [pd.DataFrame(data[key], columns=columns).infer_objects() for key in ('x_train', 'x_test')]
+
+    return data['preprocessor'], frames, ['sex', 'embarked'], ['pclass', 'age', 'sibsp', 'parch', 'fare']
+
+
+def schema_frames() -> list:
+    data = process_dataset('titanic')
+
+    return data['preprocessor'], [data['x_train'], data['x_test']], ['sex', 'embarked'], \
+        ['pclass', 'age', 'sibsp', 'parch', 'fare']
+
+
+@pytest.fixture(scope='module', params=[titanic_frames, schema_frames], ids=['process_data', 'process_dataset'])
+def fitted(request):
+    return request.param()
+
+
+def test_transform_is_the_fitted_pipeline(fitted):
+    preprocessor, (x_train, x_test), _, _ = fitted
+
+    for x in (x_train, x_test):
+        np.testing.assert_array_equal(preprocessor.transform(x), as_floatx(preprocessor.pipeline.transform(x)))
+
+    # no refit per batch - a part of a batch transforms like it does within the whole batch
+    np.testing.assert_array_equal(preprocessor.transform(x_test.iloc[:7]), preprocessor.transform(x_test)[:7])
+
+
+def test_inverse_transform_recovers_complete_rows(fitted):
+    preprocessor, (_, x_test), categorical, numeric = fitted
+    x = x_test.dropna(subset=categorical + numeric)
+    raw = preprocessor.inverse_transform(preprocessor.transform(x))
+
+    for column in categorical:
+        assert list(raw[column]) == list(x[column].astype(object))
+    for column in numeric:
+        np.testing.assert_allclose(raw[column], x[column].astype(float), rtol=1e-4, atol=1e-3)
+
+
+def test_save_load(fitted, tmp_path):
+    preprocessor, (_, x_test), _, _ = fitted
+    path = str(tmp_path / 'preprocessor.pkl')
+    preprocessor.save(path)
+
+    np.testing.assert_array_equal(FittedPreprocessor.load(path).transform(x_test), preprocessor.transform(x_test))
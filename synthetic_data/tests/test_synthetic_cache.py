@@ -0,0 +1,97 @@
+import os
+import numpy as np
+import pytest
+import tensorflow as tf
+import synthetic_cache
+from synthetic_cache import SyntheticCache
+from train_generator import create_generator_network
+
+
+@pytest.fixture(scope='module')
+def generator() -> tf.keras.Model:
+    tf.random.set_seed(0)
+    model = create_generator_network(number_hidden_layers=2, hidden_activation_function='selu', number_output_units=12)
+    model.build(input_shape=(None, 8))
+
+    return model
+
+
+@pytest.fixture
+def hashed_files(monkeypatch) -> list:
+    # paths hashed by the cache
+    paths = []
+    file_sha256 = synthetic_cache.file_sha256
+
+    def counting_sha256(path, *args, **kwargs):
+        paths.append(path)
+
+        return file_sha256(path, *args, **kwargs)
+
+    monkeypatch.setattr(synthetic_cache, 'file_sha256', counting_sha256)
+
+    return paths
+
+
+def test_hit_reads_no_file(generator, tmp_path, hashed_files):
+    cache = SyntheticCache(str(tmp_path))
+    generated = cache.get_or_generate(generator, seed=1, number_samples=300)
+    hashed_files.clear()
+
+    hit = cache.get_or_generate(generator, seed=1, number_samples=300)
+
+    assert hashed_files == []
+    np.testing.assert_array_equal(hit['x_train'], generated['x_train'])
+
+
+def test_rehash_on_request(generator, tmp_path, hashed_files):
+    SyntheticCache(str(tmp_path)).get_or_generate(generator, seed=1, number_samples=300)
+    hashed_files.clear()
+
+    SyntheticCache(str(tmp_path), rehash=True).get_or_generate(generator, seed=1, number_samples=300)
+
+    assert len(hashed_files) == 2
+
+
+def test_touched_entry_is_rehashed_once(generator, tmp_path, hashed_files):
+    cache = SyntheticCache(str(tmp_path))
+    cache.get_or_generate(generator, seed=1, number_samples=300)
+    key = cache.key(generator, seed=1, number_samples=300)
+    os.utime(os.path.join(str(tmp_path), key, 'x.npy'), ns=(0, 0))
+    hashed_files.clear()
+
+    assert cache.get(key) is not None
+    assert len(hashed_files) == 1
+    assert cache.get(key) is not None
+    assert len(hashed_files) == 1
+
+
+def test_corrupt_entry_is_regenerated(generator, tmp_path):
+    cache = SyntheticCache(str(tmp_path))
+    generated = np.array(cache.get_or_generate(generator, seed=1, number_samples=300)['x_train'])
+    key = cache.key(generator, seed=1, number_samples=300)
+    path = os.path.join(str(tmp_path), key, 'x.npy')
+
+    # same size, new content and modification time
+    with open(path, 'r+b') as f:
+        f.seek(-4, os.SEEK_END)
+        f.write(b'\0\0\0\0')
+
+    assert cache.get(key) is None
+    np.testing.assert_array_equal(cache.get_or_generate(generator, seed=1, number_samples=300)['x_train'], generated)
+
+
+def test_key_covers_the_layer_config():
+    # equal weights, another activation - seeded initializers give exactly this across an activation sweep
+    models = {}
+    for name, activation in (('selu', 'selu'), ('selu_again', 'selu'), ('tanh', 'tanh')):
+        tf.random.set_seed(0)
+        models[name] = create_generator_network(
+            number_hidden_layers=2, hidden_activation_function=activation, number_output_units=12)
+        models[name].build(input_shape=(None, 8))
+
+    models['tanh'].set_weights(models['selu'].get_weights())
+    models['selu_again'].set_weights(models['selu'].get_weights())
+    fingerprints = {name: synthetic_cache.weights_fingerprint(model) for name, model in models.items()}
+
+    assert fingerprints['selu'] == fingerprints['selu_again']
+    assert fingerprints['selu'] != fingerprints['tanh']
@@ -0,0 +1,51 @@
+import os
+import time
+import numpy as np
+import tensorflow as tf
+from gan_telemetry import PhaseTimer
+
+
+def test_phase_timer_splits_the_step():
+    # a step with real forward / backward and optimizer work - both marks have to land after their phase
+    weights = tf.Variable(tf.random.normal((2048, 2048), seed=0))
+    inputs = tf.Variable(tf.random.normal((256, 2048), seed=1))
+    optimizer = tf.keras.optimizers.Adam(learning_rate=0.001)
+    optimizer.build([weights])
+
+    @tf.function
+    def step():
+        timer = PhaseTimer(enabled=True)
+
+        with timer.phase(), tf.GradientTape() as tape:
+            loss = tf.reduce_sum(tf.matmul(inputs, weights) ** 2)
+        grads = tape.gradient(loss, [weights])
+        timer.forward_backward(grads)
+
+        with timer.phase():
+            optimizer.apply_gradients(zip(grads, [weights]))
+        timer.optimizer([weights])
+
+        return timer.append_to(tf.zeros(0))
+
+    step()
+    start_time = time.perf_counter()
+    forward_backward_seconds, optimizer_seconds = step().numpy()
+    wall_seconds = time.perf_counter() - start_time
+
+    assert forward_backward_seconds > 0.1 * wall_seconds
+    assert optimizer_seconds > 0.1 * wall_seconds
+    assert 0.5 * wall_seconds < forward_backward_seconds + optimizer_seconds <= wall_seconds
+
+
+def test_default_log_dir(tmp_path, monkeypatch):
+    # a run directory under the shared log root, without the classifier grid search and its keras wrappers
+    import run_logs
+    from gan_telemetry import StepTelemetry
+
+    monkeypatch.setattr(run_logs, 'root_logdir', str(tmp_path))
+    telemetry = StepTelemetry(sample_every=10)
+    telemetry.close()
+
+    assert os.path.dirname(telemetry.log_dir) == str(tmp_path)
+    assert telemetry.log_dir.endswith('_gan_telemetry')
+    assert os.path.isfile(os.path.join(telemetry.log_dir, 'telemetry.jsonl'))
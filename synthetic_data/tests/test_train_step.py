@@ -0,0 +1,89 @@
+import numpy as np
+import tensorflow as tf
+import train_generator
+import train_wasserstein_generator
+
+
+def make_models(module, seed: int = 0) -> tuple:
+    # built like the trainers build them, with a dropout free critic so eager and graph steps draw no random masks
+    tf.random.set_seed(seed)
+    generator_model = module.create_generator_network(
+        number_hidden_layers=2, hidden_activation_function='selu', number_output_units=12)
+    generator_model.build(input_shape=(None, 8))
+    discriminator_model = module.create_discriminator_network(hidden_activation_function='selu', use_dropout=False)
+    discriminator_model.build(input_shape=(None, 12))
+
+    return generator_model, discriminator_model
+
+
+def copy_models(models: tuple, module) -> tuple:
+    copies = make_models(module, seed=1)
+    for model, copy in zip(models, copies):
+        copy.set_weights(model.get_weights())
+
+    return copies
+
+
+def chunk(number_steps: int = 4, batch_size: int = 16) -> tuple:
+    rng = np.random.default_rng(0)
+    input_z = rng.normal(size=(number_steps, batch_size, 8)).astype(np.float32)
+    input_real = rng.normal(size=(number_steps, batch_size, 12)).astype(np.float32)
+
+    return tf.constant(input_z), tf.constant(input_real)
+
+
+def dcgan_steps(models: tuple, compiled: bool, fused_critic: bool = False):
+    return train_generator.make_train_step(
+        *models,
+        loss_fn=tf.keras.losses.BinaryCrossentropy(from_logits=True, reduction='none'),
+        g_optimizer=tf.keras.optimizers.RMSprop(learning_rate=0.0005),
+        d_optimizer=tf.keras.optimizers.RMSprop(learning_rate=0.0005),
+        fused_critic=fused_critic,
+        compiled=compiled)
+
+
+def test_dcgan_compiled_matches_eager():
+    models = make_models(train_generator)
+    copies = copy_models(models, train_generator)
+    input_z, input_real = chunk()
+
+    compiled = dcgan_steps(models, compiled=True)(input_z, input_real).numpy()
+    eager = dcgan_steps(copies, compiled=False)(input_z, input_real).numpy()
+
+    assert compiled.shape == (4, 6)
+    np.testing.assert_allclose(compiled, eager, rtol=1e-5, atol=1e-6)
+
+    for model, copy in zip(models, copies):
+        for weights, copy_weights in zip(model.get_weights(), copy.get_weights()):
+            np.testing.assert_allclose(weights, copy_weights, rtol=1e-5, atol=1e-6)
+
+
+def test_dcgan_chunk_matches_single_steps():
+    # one call over a chunk of steps is the same as one call per step
+    models = make_models(train_generator)
+    copies = copy_models(models, train_generator)
+    input_z, input_real = chunk()
+
+    chunked = dcgan_steps(models, compiled=True)(input_z, input_real).numpy()
+    single_steps = dcgan_steps(copies, compiled=True)
+    single = np.concatenate([single_steps(input_z[j:j + 1], input_real[j:j + 1]).numpy() for j in range(4)])
+
+    np.testing.assert_allclose(chunked, single, rtol=1e-5, atol=1e-6)
+
+
+def test_wasserstein_compiled_matches_eager():
+    models = make_models(train_wasserstein_generator)
+    copies = copy_models(models, train_wasserstein_generator)
+    input_z, input_real = chunk()
+
+    values = []
+    for pair, compiled in ((models, True), (copies, False)):
+        train_steps = train_wasserstein_generator.make_train_step(
+            *pair,
+            g_optimizer=tf.keras.optimizers.Adam(learning_rate=0.0001),
+            d_optimizer=tf.keras.optimizers.Adam(learning_rate=0.0001),
+            rng=tf.random.Generator.from_seed(7),
+            compiled=compiled)
+        values.append(train_steps(input_z, input_real).numpy())
+
+    np.testing.assert_allclose(values[0], values[1], rtol=1e-4, atol=1e-5)
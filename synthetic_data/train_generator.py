@@ -2,8 +2,16 @@ import time
 import itertools
 import tensorflow as tf
 import numpy as np
-from process_data import process_data
-from matplotlib import pyplot as plt
+from process_data import load_processed_data
+from gan_metrics import LossAccumulator
+from gan_checkpoint import TrainingCheckpoint
+from gan_early_stopping import FidelityEarlyStopping, split_held_out
+from gan_pipeline import make_training_dataset
+from gan_training import fused_critic_call, conditional_generator
+from gan_distribute import make_strategy, build_optimizer, distribute_train_steps, is_chief
+from gan_artifacts import submit_artifact, wait_for_artifacts, plot_training_log, export_model
+from gan_telemetry import PhaseTimer, StepTelemetry
+from rng_streams import RandomStreams, stream_seed
 
 
 # https://www.tensorflow.org/guide/random_numbers
@@ -85,7 +93,8 @@ def create_discriminator_network(
         model.add(tf.keras.layers.Activation(hidden_activation_function))
         
         if use_dropout:
-            model.add(tf.keras.layers.Dropout(dropout_rate))
+            # seeded per layer - keras keeps the mask rng state in the layer, so a checkpoint restores it
+            model.add(tf.keras.layers.Dropout(dropout_rate, seed=i))
         else:
             pass
 
@@ -94,34 +103,168 @@ def create_discriminator_network(
     return model
 
 
-@tf.function
-def preprocess(
-    passenger: np.ndarray,
-    rng: tf.random.Generator,
-    output_shape: tuple = (12,),
-    latent_space_shape: tuple = (12,),
-    mode: str='uniform'):
+def make_train_step(
+    generator_model: tf.keras.Model,
+    discriminator_model: tf.keras.Model,
+    loss_fn: tf.keras.losses.Loss,
+    g_optimizer: tf.keras.optimizers.Optimizer,
+    d_optimizer: tf.keras.optimizers.Optimizer,
+    fused_critic: bool = False,
+    steps_per_execution: int = 1,
+    strategy: tf.distribute.Strategy = None,
+    compiled: bool = True,
+    jit_compile: bool = False,
+    timed: bool = False):
+    """
+    builds the dcgan update for a chunk of batches, stacked along a leading steps axis
+
+    returns per step (g_loss, d_loss, d_loss_real, d_loss_fake, d_probs_real, d_probs_fake) - 
+    with compiled=False the exact same function runs eagerly, which is useful for debugging and parity checks
+    jit_compile=True is opt-in: xla draws dropout masks from its own rng, so losses only match the eager path in distribution
+    
+    fused_critic=True runs real and generated samples through the discriminator in one pass and reuses the fake logits
+    for both losses - generator and discriminator are then updated from the same forward pass, instead of the generator first
+    
+    with a strategy (tf.distribute) the step runs on every replica - all step values are divided by the number
+    of replicas, summed over the replicas they are the mean over the global batch
+    
+    timed=True appends the in graph (forward_backward_seconds, optimizer_seconds) of every step, see gan_telemetry
+    """
+    
+    # tf.timestamp has no xla kernel
+    assert not (timed and jit_compile), 'timed train steps cannot be jit compiled'
+    
+    number_replicas = strategy.num_replicas_in_sync if strategy else 1
+    
+    def reduce_loss(loss):
+        # mean over the replica batch, scaled so the sum over all replicas is the mean over the global batch
+        return tf.reduce_mean(loss) / number_replicas
+    
+    def train_step(input_z, input_real):
+        timer = PhaseTimer(enabled=timed, number_replicas=number_replicas)
+        
+        # generator loss, record gradients
+        with timer.phase(), tf.GradientTape() as g_tape:
+            g_output = generator_model(input_z)
+            d_logits_fake = discriminator_model(g_output, training=True)
+            labels_real = tf.ones_like(d_logits_fake)
+            g_loss = reduce_loss(loss_fn(y_true=labels_real, y_pred=d_logits_fake))
+        # get loss derivatives from tabe, only for trainable vars, in case of regularization / batchnorm
+        g_grads = g_tape.gradient(g_loss, generator_model.trainable_variables)
+        timer.forward_backward(g_grads)
+        
+        # apply optimizer for generator
+        with timer.phase():
+            g_optimizer.apply_gradients(
+                grads_and_vars=zip(g_grads, generator_model.trainable_variables))
+        timer.optimizer(generator_model.trainable_variables)
+
+        # discriminator loss, gradients
+        with timer.phase(), tf.GradientTape() as d_tape:
+            d_logits_real = discriminator_model(input_real, training=True)
+
+            d_labels_real = tf.ones_like(d_logits_real)
+            
+            # loss for the real examples - labeles as 1
+            d_loss_real = reduce_loss(loss_fn(
+                y_true=d_labels_real, y_pred=d_logits_real))
+
+            # loss for the fakes - labeled as 0 
+            
+            # apply discriminator to generator output like a function
+            d_logits_fake = discriminator_model(g_output, training=True)
+            d_labels_fake = tf.zeros_like(d_logits_fake)
+
+            # loss function
+            d_loss_fake = reduce_loss(loss_fn(
+                y_true=d_labels_fake, y_pred=d_logits_fake))
+
+            # compute component loss for real & fake
+            d_loss = d_loss_real + d_loss_fake
+
+        # get the loss derivatives from the tape
+        d_grads = d_tape.gradient(d_loss, discriminator_model.trainable_variables)
+        timer.forward_backward(d_grads)
+        
+        # apply optimizer to discriminator gradients - only trainable :todo: add regularization here
+        with timer.phase():
+            d_optimizer.apply_gradients(
+                grads_and_vars=zip(d_grads, discriminator_model.trainable_variables))
+        timer.optimizer(discriminator_model.trainable_variables)
+        
+        # probabilities from logits for predcitions, using tf builtin
+        d_probs_real = reduce_loss(tf.sigmoid(d_logits_real))
+        d_probs_fake = reduce_loss(tf.sigmoid(d_logits_fake))
+        
+        return timer.append_to(tf.stack([g_loss, d_loss, d_loss_real, d_loss_fake, d_probs_real, d_probs_fake]))
+    
+    def fused_train_step(input_z, input_real):
+        timer = PhaseTimer(enabled=timed, number_replicas=number_replicas)
+        
+        # single tape pass: the fake logits feed both the generator and the discriminator loss
+        with timer.phase(), tf.GradientTape() as g_tape, tf.GradientTape() as d_tape:
+            g_output = generator_model(input_z)
+            d_logits_real, d_logits_fake = fused_critic_call(
+                discriminator_model, input_real, g_output, training=True)
+            
+            g_loss = reduce_loss(loss_fn(y_true=tf.ones_like(d_logits_fake), y_pred=d_logits_fake))
+            
+            d_loss_real = reduce_loss(loss_fn(y_true=tf.ones_like(d_logits_real), y_pred=d_logits_real))
+            d_loss_fake = reduce_loss(loss_fn(y_true=tf.zeros_like(d_logits_fake), y_pred=d_logits_fake))
+            d_loss = d_loss_real + d_loss_fake
+        
+        g_grads = g_tape.gradient(g_loss, generator_model.trainable_variables)
+        d_grads = d_tape.gradient(d_loss, discriminator_model.trainable_variables)
+        timer.forward_backward(g_grads, d_grads)
+        
+        with timer.phase():
+            g_optimizer.apply_gradients(
+                grads_and_vars=zip(g_grads, generator_model.trainable_variables))
+            d_optimizer.apply_gradients(
+                grads_and_vars=zip(d_grads, discriminator_model.trainable_variables))
+        timer.optimizer(generator_model.trainable_variables, discriminator_model.trainable_variables)
+        
+        d_probs_real = reduce_loss(tf.sigmoid(d_logits_real))
+        d_probs_fake = reduce_loss(tf.sigmoid(d_logits_fake))
+        
+        return timer.append_to(tf.stack([g_loss, d_loss, d_loss_real, d_loss_fake, d_probs_real, d_probs_fake]))
     
-    assert passenger.shape == output_shape, f'data shape needs to match the expected output shape {output_shape} - shape is {passenger.shape}'
+    if fused_critic:
+        train_step = fused_train_step
+    
+    if strategy is not None:
+        # strategy.run can't hold graph control flow or nested tf.functions around the optimizer updates -
+        # the chunk is unrolled in python instead
+        def replica_steps(input_z, input_real):
+            return tf.stack([train_step(input_z[j], input_real[j]) for j in range(steps_per_execution)])
+        
+        return distribute_train_steps(strategy, replica_steps)
     
-    passenger = tf.convert_to_tensor(passenger)
+    if compiled:
+        # only the single step goes through XLA - the loop over the chunk stays a regular graph loop
+        train_step = tf.function(train_step, jit_compile=jit_compile)
     
-    if mode == 'uniform':
-        input_z = rng.uniform(
-            shape=latent_space_shape, 
-            minval=-1.0, maxval=1.0)
+    def train_steps(input_z, input_real):
+        number_steps = tf.shape(input_z)[0]
+        step_values = tf.TensorArray(tf.float32, size=number_steps)
+        
+        for j in tf.range(number_steps):
+            step_values = step_values.write(j, train_step(input_z[j], input_real[j]))
+        
+        return step_values.stack()
     
-    elif mode == 'normal':
-        input_z = rng.normal(shape=latent_space_shape)
+    if compiled:
+        train_steps = tf.function(train_steps)
     
-    return input_z, passenger
+    return train_steps
 
 
 def train_generator(
     training_data: np.ndarray,
     latent_space_shape: int=8,
     latent_space_mode: str='normal',
-    rng: tf.random.Generator=tf.random.Generator.from_seed(42),
+    rng: tf.random.Generator=None,
+    streams: RandomStreams = None,
     number_hidden_layers: int = 2,
     number_hidden_units_power: int = 5,
     hidden_activation: str = 'selu',
@@ -130,27 +273,99 @@ def train_generator(
     tensorflow_device: str = device_name,
     generate_img: bool = True,
     learning_rate: float = 0.0005,
-    export_generator: bool = True) -> tf.keras.Model:
+    export_generator: bool = True,
+    compiled: bool = True,
+    steps_per_execution: int = 1,
+    jit_compile: bool = False,
+    fused_critic: bool = False,
+    distribute: str = None,
+    number_replicas: int = None,
+    metrics_flush_every: int = 256,
+    checkpoint_dir: str = None,
+    checkpoint_every: int = 10,
+    keep_checkpoints: int = 3,
+    conditional: bool = False,
+    telemetry_every: int = None,
+    telemetry_dir: str = None,
+    early_stopping: bool = False,
+    validation_split: float = 0.1,
+    check_every: int = 5,
+    patience: int = 3,
+    background_artifacts: bool = True) -> tf.keras.Model:
     
     
     data_shape = training_data.shape[1]
     data_shape = (data_shape,)
     
-    training_data = tf.data.Dataset.from_tensor_slices(training_data)
-    training_data = training_data.map(lambda x: preprocess(x, rng=rng, latent_space_shape=(latent_space_shape,), mode=latent_space_mode, output_shape=data_shape))
-            
-    training_data = training_data.shuffle(10000)
-    training_data = training_data.batch(
-        batch_size, drop_remainder=True)
+    # data parallel training - batch_size is per replica, the global batch is batch_size * replicas
+    # the strategy comes first: any tensorflow variable or rng created before it initializes the runtime,
+    # after which the cpu can't be split into logical devices (mirrored) or collective ops configured (multi_worker)
+    strategy = make_strategy(distribute, number_replicas) if distribute else None
+    replicas = strategy.num_replicas_in_sync if strategy else 1
+    
+    # created per call, after the strategy - a generator as default argument would initialize the runtime at import
+    # with streams, initializers, latent noise and the held out rows come from streams of their own -
+    # the run then only depends on the streams seed, not on what ran in the process before
+    if streams is not None:
+        streams.stream('initializers').seed_globals()
+        
+        if rng is None:
+            rng = streams.stream('latent').tensorflow()
+    
+    if rng is None:
+        rng = tf.random.Generator.from_seed(42)
+    
+    # early stopping scores the generator against held out real rows, which are taken out of the training data
+    if early_stopping:
+        training_data, held_out = split_held_out(
+            training_data, validation_split=validation_split, seed=stream_seed(streams, 'held_out'))
+    
+    steps_per_epoch = training_data.shape[0] // (batch_size * replicas)
+    
+    if strategy is None:
+        training_data = make_training_dataset(
+            training_data,
+            rng=rng,
+            latent_space_shape=latent_space_shape,
+            latent_space_mode=latent_space_mode,
+            batch_size=batch_size,
+            steps_per_execution=steps_per_execution,
+            conditional=conditional)
+        
+        epoch_chunks = lambda: training_data
     
-    with tf.device(tensorflow_device):
+    else:
+        # repeated per replica pipelines, every epoch takes the same number of chunks on all workers
+        chunks_per_epoch = steps_per_epoch // steps_per_execution
+        steps_per_epoch = chunks_per_epoch * steps_per_execution
+        
+        real_data = training_data
+        training_data = iter(strategy.distribute_datasets_from_function(
+            lambda input_context: make_training_dataset(
+                real_data,
+                rng=rng,
+                latent_space_shape=latent_space_shape,
+                latent_space_mode=latent_space_mode,
+                batch_size=batch_size,
+                steps_per_execution=steps_per_execution,
+                repeat=True,
+                input_context=input_context,
+                conditional=conditional)))
+        
+        epoch_chunks = lambda: itertools.islice(training_data, chunks_per_epoch)
+    
+    with strategy.scope() if strategy else tf.device(tensorflow_device):
         generator_model = create_generator_network(
             number_hidden_layers=number_hidden_layers,
             number_hidden_units_power=number_hidden_units_power,
             hidden_activation_function=hidden_activation,
-            number_output_units=np.product(data_shape))
+            number_output_units=int(np.prod(data_shape)) - int(conditional))
         
-        generator_model.build(input_shape=(None, latent_space_shape))
+        generator_model.build(input_shape=(None, latent_space_shape + int(conditional)))
+        
+        if conditional:
+            # the last training data column is the label - the generator gets it as input and only produces the features
+            generator_model = conditional_generator(generator_model)
 #        print(generator_model.summary())
         
         discriminator_model = create_discriminator_network(
@@ -161,164 +376,167 @@ def train_generator(
         discriminator_model.build(input_shape=(None, np.prod(data_shape)))
 #        print(discriminator_model.summary())
         
-    # Loss functions and optimizers
-    loss_fn = tf.keras.losses.BinaryCrossentropy(from_logits=True)
-    g_optimizer = tf.keras.optimizers.RMSprop(learning_rate=learning_rate)
-    d_optimizer = tf.keras.optimizers.RMSprop(learning_rate=learning_rate)
+        # Loss functions and optimizers - per sample losses, reduced in the train step
+        loss_fn = tf.keras.losses.BinaryCrossentropy(from_logits=True, reduction='none')
+        g_optimizer = tf.keras.optimizers.RMSprop(learning_rate=learning_rate)
+        d_optimizer = tf.keras.optimizers.RMSprop(learning_rate=learning_rate)
+        
+        if strategy is not None:
+            build_optimizer(g_optimizer, generator_model.trainable_variables)
+            build_optimizer(d_optimizer, discriminator_model.trainable_variables)
+        
+        train_steps = make_train_step(
+            generator_model=generator_model,
+            discriminator_model=discriminator_model,
+            loss_fn=loss_fn,
+            g_optimizer=g_optimizer,
+            d_optimizer=d_optimizer,
+            fused_critic=fused_critic,
+            steps_per_execution=steps_per_execution,
+            strategy=strategy,
+            compiled=compiled,
+            jit_compile=jit_compile,
+            timed=telemetry_every is not None)
     
-    # lists to store losses and values
-    all_losses = []
-    all_d_vals = []
+    fidelity_stopping = None
     
-    start_time = time.time()
-    for epoch in range(1, n_epochs+1):
-        epoch_losses, epoch_d_vals = [], []
-        for i,(input_z,input_real) in enumerate(training_data):
-            
-            # generator loss, record gradients
-            with tf.GradientTape() as g_tape:
-                g_output = generator_model(input_z)
-                d_logits_fake = discriminator_model(g_output, training=True)
-                labels_real = tf.ones_like(d_logits_fake)
-                g_loss = loss_fn(y_true=labels_real, y_pred=d_logits_fake)
-            # get loss derivatives from tabe, only for trainable vars, in case of regularization / batchnorm
-            g_grads = g_tape.gradient(g_loss, generator_model.trainable_variables)
-            
-            # apply optimizer for generator
-            g_optimizer.apply_gradients(
-                grads_and_vars=zip(g_grads, generator_model.trainable_variables))
+    if early_stopping:
+        fidelity_stopping = FidelityEarlyStopping(
+            generator_model,
+            held_out=held_out,
+            latent_space_shape=latent_space_shape,
+            latent_space_mode=latent_space_mode,
+            check_every=check_every,
+            patience=patience,
+            seed=stream_seed(streams, 'fidelity'),
+            conditional=conditional)
     
-            # discriminator loss, gradients
-            with tf.GradientTape() as d_tape:
-                d_logits_real = discriminator_model(input_real, training=True)
+    # sampled step timings, only the chief writes them
+    telemetry = None
     
-                d_labels_real = tf.ones_like(d_logits_real)
-                
-                # loss for the real examples - labeles as 1
-                d_loss_real = loss_fn(
-                    y_true=d_labels_real, y_pred=d_logits_real)
+    if telemetry_every is not None:
+        telemetry = StepTelemetry(
+            log_dir=telemetry_dir,
+            sample_every=telemetry_every,
+            samples_per_step=batch_size * replicas,
+            write=is_chief(strategy))
     
-                # loss for the fakes - labeled as 0 
-                
-                # apply discriminator to generator output like a function
-                d_logits_fake = discriminator_model(g_output, training=True)
-                d_labels_fake = tf.zeros_like(d_logits_fake)
+    # losses and discriminator outputs are accumulated on device, copied to the host every few hundred steps
+    metrics = LossAccumulator(
+        n_epochs=n_epochs,
+        steps_per_epoch=steps_per_epoch,
+        flush_every=max(metrics_flush_every, steps_per_execution))
     
-                # loss function
-                d_loss_fake = loss_fn(
-                    y_true=d_labels_fake, y_pred=d_logits_fake)
+    # periodic checkpoints of the whole training state - a run with an existing checkpoint in checkpoint_dir resumes from it
+    checkpoint = None
+    start_epoch = 0
     
-                # compute component loss for real & fake
-                d_loss = d_loss_real + d_loss_fake
+    if checkpoint_dir is not None:
+        checkpoint = TrainingCheckpoint(
+            checkpoint_dir,
+            metrics=metrics,
+            keep_last=keep_checkpoints,
+            exact_resume=strategy is None,
+            generator=generator_model,
+            discriminator=discriminator_model,
+            g_optimizer=g_optimizer,
+            d_optimizer=d_optimizer,
+            rng=rng,
+            early_stopping=fidelity_stopping)
+        start_epoch = checkpoint.restore()
     
-            # get the loss derivatives from the tape
-            d_grads = d_tape.gradient(d_loss, discriminator_model.trainable_variables)
+    start_time = time.time()
+    for epoch in range(start_epoch + 1, n_epochs+1):
+        # a resumed run that already stopped early
+        if fidelity_stopping is not None and fidelity_stopping.stopped.numpy():
+            break
+        
+        chunks = epoch_chunks() if telemetry is None else telemetry.timed_input(epoch_chunks())
+        
+        for i,(input_z,input_real) in enumerate(chunks):
             
-            # apply optimizer to discriminator gradients - only trainable :todo: add regularization here
-            d_optimizer.apply_gradients(
-                grads_and_vars=zip(d_grads, discriminator_model.trainable_variables))
-                               
-            # add step loss to epoch list
-            epoch_losses.append(
-                (g_loss.numpy(), d_loss.numpy(), 
-                 d_loss_real.numpy(), d_loss_fake.numpy()))
+            step_values = train_steps(input_z, input_real)
+            
+            if telemetry is not None:
+                step_values = telemetry.update(step_values)
             
-            # probabilities from logits for predcitions, using tf builtin
-            d_probs_real = tf.reduce_mean(tf.sigmoid(d_logits_real))
-            d_probs_fake = tf.reduce_mean(tf.sigmoid(d_logits_fake))
-            epoch_d_vals.append((d_probs_real.numpy(), d_probs_fake.numpy()))        
-        
-        # record loss
-        all_losses.append(epoch_losses)
-        all_d_vals.append(epoch_d_vals)
+            metrics.update(step_values)
+        
         print(
             'Epoch {:03d} | ET {:.2f} min | Avg Losses >>'
             ' G/D {:.4f}/{:.4f} [D-Real: {:.4f} D-Fake: {:.4f}]'
             .format(
                 epoch, (time.time() - start_time)/60, 
-                *list(np.mean(all_losses[-1], axis=0))))
-    result = {
-        'all_losses': all_losses,
-        'all_d_vals': all_d_vals,
-        'generator': generator_model,
-        'discriminator': discriminator_model}
+                *list(metrics.epoch_means()[:4])))
+        
+        stop = fidelity_stopping is not None and fidelity_stopping.update(epoch)
+        
+        if checkpoint is not None and (epoch % checkpoint_every == 0 or epoch == n_epochs or stop) and is_chief(strategy):
+            checkpoint.save(epoch)
+        
+        if stop:
+            break
+    
+    if fidelity_stopping is not None:
+        fidelity_stopping.restore()
+    
+    if telemetry is not None:
+        telemetry.close()
+    
+    result = metrics.result()
+    result['generator'] = generator_model
+    result['discriminator'] = discriminator_model
+    
+    if fidelity_stopping is not None:
+        # (epoch, score) of every fidelity check, those before a resume included
+        result['fidelity_scores'] = list(fidelity_stopping.scores)
+    
+    if telemetry is not None:
+        # the sampled telemetry records, also written to telemetry_dir
+        result['telemetry'] = telemetry.records
+    
+    # (epochs, steps, values) arrays
+    all_losses = result['all_losses']
+    all_d_vals = result['all_d_vals']
 
     model_name = f'e_{n_epochs}_layers_{number_hidden_layers}_units_{number_hidden_units_power}'
 
     
-    if generate_img:
+    # plotting and export run on a background worker, training returns right away -
+    # result['artifacts'] holds the futures, see gan_artifacts.wait_for_artifacts
+    result['artifacts'] = []
+    
+    if generate_img and is_chief(strategy):
         
         print()
         print('generating training log image')
         
-        fig = plt.figure(figsize=(20, 10))
-    
-        ## Plotting the losses
-        ax = fig.add_subplot(1, 2, 1)
-        g_losses = [item[0] for item in itertools.chain(*all_losses)]
-        d_losses = [item[1]/2.0 for item in itertools.chain(*all_losses)]
-        plt.plot(g_losses, label='Generator loss', alpha=0.75)
-        plt.plot(d_losses, label='Discriminator loss', alpha=0.75)
-        plt.legend(fontsize=20)
-        ax.set_xlabel('Iteration', size=15)
-        ax.set_ylabel('Loss', size=15)
-        
-        epochs = np.arange(1, n_epochs + 1)
-        epoch2iter = lambda e: e*len(all_losses[-1])
-        epoch_ticks = np.arange(0, n_epochs, 20)
-        
-        newpos = [epoch2iter(e) for e in epoch_ticks]
-        ax2 = ax.twiny()
-        ax2.set_xticks(newpos)
-        ax2.set_xticklabels(epoch_ticks)
-        ax2.xaxis.set_ticks_position('bottom')
-        ax2.xaxis.set_label_position('bottom')
-        ax2.spines['bottom'].set_position(('outward', 60))
-        ax2.set_xlabel('Epoch', size=15)
-        ax2.set_xlim(ax.get_xlim())
-        ax.tick_params(axis='both', which='major', labelsize=15)
-        ax2.tick_params(axis='both', which='major', labelsize=15)
-        
-        # Plotting the outputs of the discriminator
-        ax = fig.add_subplot(1, 2, 2)
-        d_vals_real = [item[0] for item in itertools.chain(*all_d_vals)]
-        d_vals_fake = [item[1] for item in itertools.chain(*all_d_vals)]
-        plt.plot(d_vals_real, alpha=0.75, label=r'Real: $D(\mathbf{x})$')
-        plt.plot(d_vals_fake, alpha=0.75, label=r'Fake: $D(G(\mathbf{z}))$')
-        plt.legend(fontsize=20)
-        ax.set_xlabel('Iteration', size=15)
-        ax.set_ylabel('Discriminator output', size=15)
-        
-        ax2 = ax.twiny()
-        ax2.set_xticks(newpos)
-        ax2.set_xticklabels(epoch_ticks)
-        ax2.xaxis.set_ticks_position('bottom')
-        ax2.xaxis.set_label_position('bottom')
-        ax2.spines['bottom'].set_position(('outward', 60))
-        ax2.set_xlabel('Epoch', size=15)
-        ax2.set_xlim(ax.get_xlim())
-        ax.tick_params(axis='both', which='major', labelsize=15)
-        ax2.tick_params(axis='both', which='major', labelsize=15)
-        
-        
-        plt.savefig(f'../img/{model_name}.png')
-        
-        print(f'image saved to: ../img/{model_name}.png')
-    
-    if export_generator:
+        result['artifacts'].append(submit_artifact(
+            plot_training_log,
+            all_losses,
+            all_d_vals,
+            f'../img/{model_name}.png',
+            # the discriminator loss is plotted per real / fake half
+            d_loss_scale=0.5,
+            epoch_tick_step=20))
+    
+    if export_generator and is_chief(strategy):
         
         print()
         print('saving generator model')
         
-        tf.keras.models.save_model(generator_model, f'../models/generator_{model_name}.h5')
-        print(f'generator model saved to: ../models/{model_name}.h5')
+        result['artifacts'].append(submit_artifact(
+            export_model, generator_model, f'../models/generator_{model_name}.h5'))
+    
+    if not background_artifacts:
+        wait_for_artifacts(result['artifacts'])
         
     return result
 
 
 if __name__ == '__main__':
     
-    data = process_data()    
+    data = load_processed_data()
     x_train = data['x_train_processed']
     y_train = data['y_train']
 